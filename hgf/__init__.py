@@ -26,7 +26,7 @@ from .gui import\
     Menu,\
     Button, LabeledButton,\
     TextEntryBox, TextField,\
-    Text, TextBox,\
+    Text, TextBox, TextFrame,\
     Image,\
     DragWidget, SlideWidget,\
     SimpleWidget, Widget,\
@@ -56,7 +56,7 @@ __all__ = [
     'Menu',
     'Button', 'LabeledButton',
     'TextEntryBox', 'TextField',
-    'Text', 'TextBox',
+    'Text', 'TextBox', 'TextFrame',
     'Image',
     'DragWidget', 'SlideWidget',
     'SimpleWidget', 'Widget',
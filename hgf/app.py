@@ -16,12 +16,17 @@
 #                                                                             #
 ###############################################################################
 
-from .gui import Window
+from .gui import Window, LayeredComponent
+from .util import TextureAtlas, LRUCache, Clipboard, FontManager, SurfacePool, GeometryStore
+from .util.alpha import BLEND_PREMULTIPLIED
+from .util.cache import surface_bytes
 
 import pygame
 import pygame.freetype
 
+from concurrent.futures import ThreadPoolExecutor
 import json
+import logging
 import os.path
 
 
@@ -59,6 +64,8 @@ class AppResources:
         self.sounds = dict()
         self.music = dict()
 
+        self.atlases = dict()
+
     def load_fonts(self, info):
         for name, filename in info.items():
             try:
@@ -78,6 +85,25 @@ class AppResources:
             else:
                 self.images[name] = image
 
+    def load_atlases(self, info):
+        packed = {name for atlas in self.atlases.values() for name in atlas.regions}
+        for group, attrs in info.items():
+            atlas = TextureAtlas(size=attrs.get('size', (1024, 1024)),
+                                 padding=attrs.get('padding', 1),
+                                 max_image_size=attrs.get('max-image-size'))
+            try:
+                names = attrs['images']
+            except KeyError:
+                names = [name for name in self.images if name not in packed]
+            try:
+                images = {name: self.images[name] for name in names}
+            except KeyError as err:
+                raise KeyError('Cannot pack unknown image \'{}\' into atlas \'{}\''.format(err.args[0], group)) from err
+            regions = atlas.pack_all(images)
+            self.images.update(regions)
+            packed |= set(regions)
+            self.atlases[group] = atlas
+
     def load_sounds(self, info):
         for name, filename in info.items():
             try:
@@ -99,6 +125,9 @@ class AppResources:
     def load(self):
         self.load_fonts(load_json(self.directory.get_path('info', 'fonts')))
         self.load_images(load_json(self.directory.get_path('info', 'images')))
+        atlases = self.directory.get_path('info', 'atlases')
+        if os.path.isfile(atlases + '.json'):
+            self.load_atlases(load_json(atlases))
         self.load_sounds(load_json(self.directory.get_path('info', 'sounds')))
         self.load_music(load_json(self.directory.get_path('info', 'music')))
 
@@ -248,10 +277,46 @@ class AppConfig:
 
 # TODO: reload_options should handle changing window size
 class App(Window):
+    # Default values
+    TEXT_CACHE_SIZE = 4 * 2**20
+    GLYPH_ATLAS_COUNT = 32
+    FONT_COUNT = 64
+    BACKGROUND_CACHE_SIZE = 8 * 2**20
+    SURFACE_POOL_SIZE = 16 * 2**20
+    OUTPUT_THREADS = 1
+
     def __init__(self, manager, **kwargs):
         self._directory = manager.directory
         self._resources = manager.resources
 
+        # Rendered text shared by every Text in the app, keyed by (font, size, fgcolor, text)
+        self._text_cache = LRUCache(App.TEXT_CACHE_SIZE, weigh=surface_bytes)
+
+        # Glyph atlases for Texts in glyph atlas mode, keyed by (font, size, fgcolor)
+        self._glyph_atlases = LRUCache(App.GLYPH_ATLAS_COUNT)
+
+        # Sized handles onto the shared font faces, which cache their metrics and glyph advances
+        self._fonts = FontManager(App.FONT_COUNT)
+
+        # Surfaces made by style background factories, keyed by (factory, args, colorkey)
+        self._backgrounds = LRUCache(App.BACKGROUND_CACHE_SIZE, weigh=surface_bytes)
+
+        # Idle buffers for the backgrounds and displays of resized components
+        self._surfaces = SurfacePool(App.SURFACE_POOL_SIZE)
+
+        # System clipboard, accessed off the main thread when it would block
+        self._clipboard = Clipboard()
+
+        # Whether surfaces with per-pixel alpha are premultiplied, and composited with BLEND_PREMULTIPLIED
+        self._premultiplied = False
+
+        # Workers that composite the layered components of each level of the tree in parallel
+        self._output_threads = App.OUTPUT_THREADS
+        self._output_executor = None
+
+        # Geometry of every loaded graphical component in contiguous arrays, for batch queries (requires numpy)
+        self._geometry = None
+
         self._config = AppConfig(self._directory, self._resources)
         self._config.style_packs = manager.style_packs
         self._config.compose_style = manager.compose_style
@@ -261,6 +326,15 @@ class App(Window):
         super().__init__(w=w, h=h, **kwargs)
         self.app = self
 
+        if self.options_get('geometry-store', False):
+            if GeometryStore.is_available():
+                self._geometry = GeometryStore()
+            else:
+                logging.warning('Option "geometry-store" needs numpy (pip install hgf[numpy]), so it is ignored')
+
+        # Before anything is rendered, since surfaces made in the other mode would be blended wrongly
+        self._set_premultiplied(self.options_get('premultiplied-alpha', False))
+
         self._focus_stack = []
 
         try:
@@ -268,6 +342,84 @@ class App(Window):
         except pygame.error:
             pass
 
+    def load_options(self):
+        super().load_options()
+        self._text_cache.budget = self.options_get('text-cache-size', App.TEXT_CACHE_SIZE)
+        self._glyph_atlases.budget = self.options_get('glyph-atlas-count', App.GLYPH_ATLAS_COUNT)
+        self._fonts.budget = self.options_get('font-count', App.FONT_COUNT)
+        self._backgrounds.budget = self.options_get('background-cache-size', App.BACKGROUND_CACHE_SIZE)
+        self._surfaces.budget = self.options_get('surface-pool-size', App.SURFACE_POOL_SIZE)
+
+        self._set_premultiplied(self.options_get('premultiplied-alpha', False))
+
+        output_threads = self.options_get('output-threads', App.OUTPUT_THREADS)
+        if output_threads != self._output_threads:
+            self._output_threads = output_threads
+            if self._output_executor is not None:
+                self._output_executor.shutdown(wait=False)
+            self._output_executor = ThreadPoolExecutor(output_threads) if output_threads > 1 else None
+
+    def _set_premultiplied(self, premultiplied):
+        premultiplied = bool(premultiplied) and BLEND_PREMULTIPLIED is not None
+        if premultiplied == self._premultiplied:
+            return
+        # Cached surfaces were prepared for the other mode
+        self._premultiplied = premultiplied
+        self._text_cache.clear()
+        self._glyph_atlases.clear()
+        self._backgrounds.clear()
+        if premultiplied:
+            for atlas in self._resources.atlases.values():
+                atlas.premultiply()
+
+    def launch(self, fps=None, debug=False):
+        # The output threads only live as long as the main loop
+        if self._output_executor is None and self._output_threads > 1:
+            self._output_executor = ThreadPoolExecutor(self._output_threads)
+        try:
+            super().launch(fps, debug)
+        finally:
+            if self._output_executor is not None:
+                self._output_executor.shutdown()
+                self._output_executor = None
+
+    def load_style(self):
+        super().load_style()
+        # Restyling may replace the factories, so their old surfaces are of no use
+        self._backgrounds.clear()
+
+    def _step_input(self):
+        super()._step_input()
+        self._clipboard.poll()
+
+    def _recursive_step_output(self):
+        # Culling and dirty rects are looked up from the geometry store, rather than computed for each component
+        if self._geometry is not None:
+            self._geometry.prepare()
+        if self._output_executor is None:
+            super()._recursive_step_output()
+            return
+
+        # Every component is output after its children, so the tree is output a level at a time from the bottom
+        levels = [[self]]
+        while levels[-1]:
+            levels.append([child for component in levels[-1] for child in component._output_children()])
+        for level in reversed(levels):
+            layered = []
+            for component in level:
+                if isinstance(component, LayeredComponent) and len(level) > 1:
+                    layered.append(component)
+                else:
+                    component._step_output()
+            # Blits release the GIL, and layered components never share a display
+            for _ in self._output_executor.map(_step_output, layered):
+                pass
+
+    def _recursive_step_reset(self):
+        super()._recursive_step_reset()
+        if self._geometry is not None:
+            self._geometry.flip()
+
     def load_style_from(self, filename):
         self._config.load_style_from(filename)
         self._recursive_load_style()
@@ -279,6 +431,17 @@ class App(Window):
     def load_controls_from(self, filename):
         self._config.load_controls_from(filename)
 
+    def get_image(self, name):
+        try:
+            return self._resources.images[name]
+        except KeyError:
+            pass
+        raise KeyError('Cannot find the requested image \'{}\''.format(name))
+
+
+def _step_output(component):
+    return component._step_output()
+
 
 class AppManager:
     def __init__(self, name, factory=App):
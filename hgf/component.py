@@ -20,7 +20,9 @@ from .double_buffer import _HookHandler,  responsive, double_buffer
 import logging
 
 
-class Component(metaclass=_HookHandler):
+class Component(metaclass=_HookHandler, compiled=True):
+    _cache_bitmap = False
+
     def __init__(self, *args,
                  frozen=False,
                  pause=False,
@@ -37,6 +39,9 @@ class Component(metaclass=_HookHandler):
         self.parent = None
         self._children = []
 
+        # Ancestors caching their subtree as a bitmap, which are the only ones that need to hear about changes
+        self._cached_ancestors = 0
+
         # State flags
         self.is_loaded = False
 
@@ -213,6 +218,7 @@ class Component(metaclass=_HookHandler):
                 child.parent.unregister(child)
             child.parent = self
             child.app = self._app
+            child._set_cached_ancestors(self._cached_ancestors + self._cache_bitmap)
             if child._context is None and self._context is not None:
                 child.context = self._context
             child.on_adoption()
@@ -229,6 +235,7 @@ class Component(metaclass=_HookHandler):
             child.app = None
             child.parent = None
             child.context = None
+            child._set_cached_ancestors(0)
             self._children.remove(child)
 
     def handle_message(self, sender, message, **params):
@@ -240,6 +247,19 @@ class Component(metaclass=_HookHandler):
         else:
             logging.warning('Unhandled message: "{}"'.format(message), params)
 
+    def _set_cached_ancestors(self, count):
+        self._cached_ancestors = count
+        for child in self._children:
+            child._set_cached_ancestors(count + self._cache_bitmap)
+
+    def invalidate_cache(self):
+        if self._cached_ancestors:
+            self.parent.invalidate_cache()
+
+    def _on_transition_queued(self):
+        if self._cached_ancestors:
+            self.parent.invalidate_cache()
+
     def _step_input(self): pass
 
     def _step_tick(self, elapsed):
@@ -262,10 +282,14 @@ class Component(metaclass=_HookHandler):
                 child._recursive_step_tick(elapsed)
         self._step_tick(elapsed)
 
-    def _recursive_step_output(self):
+    def _output_children(self):
         for child in self._children:
             if (child.old_is_active or child.is_active) and child.is_visible:
-                child._recursive_step_output()
+                yield child
+
+    def _recursive_step_output(self):
+        for child in self._output_children():
+            child._recursive_step_output()
         self._step_output()
 
     def _recursive_step_reset(self):
@@ -1,3 +1,7 @@
+from itertools import count
+from operator import attrgetter
+
+
 class double_buffer:
     def __init__(self, cls):
         self.__name__ = cls.__name__
@@ -26,10 +30,14 @@ class double_buffer:
         underscores = self.__name__[:underscores]
 
         self._curr_name = '__current_{}'.format(self.__name__)
+        self._slot_name = '_current_{}'.format(self.__name__)
         self._prev_name = '{}old_{}'.format(underscores, name)
         self._transition_hook_name = '{}on_{}_transition'.format(underscores, name)
         self._change_hook_name = '{}on_{}_change'.format(underscores, name)
 
+        # Name in the class namespace, which is mangled for private double buffers
+        self._attr_name = self.__name__
+
     def __get__(self, instance, owner):
         try:
             return getattr(instance, self._curr_name)
@@ -57,6 +65,7 @@ class double_buffer:
             pass
         if value != getattr(instance, self._prev_name):
             queue.append(self)
+            instance._on_transition_queued()
 
 
 class _responsive:
@@ -93,13 +102,80 @@ def responsive(init=False, priority=0, children_first=False):
     return responsive_factory
 
 
+# TODO: Maintain priority-specified order AND after_children-specified order?
+def _recursive_refresh_responsive_attrs(self):
+    self._refresh_responsive_attrs(children_first=False)
+    for child in self._children:
+        if child.old_is_active or child.is_active:
+            child._recursive_refresh_responsive_attrs()
+    self._refresh_responsive_attrs(children_first=True)
+
+
+def _recursive_call_transition_hooks(self):
+    self._call_transition_hooks()
+    for child in self._children:
+        if child.old_is_active or child.is_active:
+            child._recursive_call_transition_hooks()
+
+
 class _HookHandler(type):
     _initialized_flag_name = '__HookHandler_is_initialized'
     _transition_hook_queue_name = '__transition_hook_queue'
     _double_buffers_name = '__double_buffers'
     _responsive_attrs_name = '__responsive_attrs'
+    _compiled_flag_name = '__HookHandler_is_compiled'
+    _slotted_names_name = '__slotted_double_buffers'
+
+    # Generated step functions, which a class may still define for itself
+    _compiled_functions = ('_init_double_buffers', '_call_transition_hooks', '_flip_transition_hooks',
+                           '_refresh_responsive_attrs')
+
+    def __new__(mcs, name, bases, namespace, compiled=None):
+        inherited = any(getattr(sprcls, _HookHandler._compiled_flag_name, False) for sprcls in bases)
+        explicit = compiled is not None
+        if not explicit:
+            compiled = inherited
+        elif inherited and not compiled:
+            raise TypeError('A class cannot leave the compiled mode of its superclasses: {}'.format(name))
+
+        slotted = set()
+        if compiled and explicit:
+            # Only classes that ask for the compiled mode get slots, so that their subclasses can still be mixed
+            namespace = dict(namespace)
+            slots = namespace.get('__slots__')
+            if slots is None:
+                slots = []
+                if not any(sprcls.__dictoffset__ for sprcls in bases):
+                    slots.append('__dict__')
+                if not any(sprcls.__weakrefoffset__ for sprcls in bases):
+                    slots.append('__weakref__')
+            else:
+                slots = [slots] if isinstance(slots, str) else list(slots)
+            if not inherited:
+                slots += ['_pending_transitions', '_transition_stamps', '_transitions_initialized']
+            for attr in namespace.values():
+                if isinstance(attr, double_buffer) and not any(hasattr(sprcls, attr._prev_name) for sprcls in bases):
+                    names = (attr._slot_name, attr._prev_name)
+                    # Private names would be mangled by __slots__
+                    if not any(n.startswith('__') for n in names):
+                        slots += names
+                        slotted.add(attr._slot_name)
+            namespace['__slots__'] = tuple(slots)
+
+        cls = super().__new__(mcs, name, bases, namespace)
+        if compiled:
+            setattr(cls, _HookHandler._compiled_flag_name, True)
+            for sprcls in bases:
+                slotted.update(getattr(sprcls, _HookHandler._slotted_names_name, ()))
+            setattr(cls, _HookHandler._slotted_names_name, frozenset(slotted))
+        return cls
 
     def __init__(cls, name, *bases, **namespace):
+        if getattr(cls, _HookHandler._compiled_flag_name, False):
+            _compile_hooks(cls, bases[0], bases[1])
+            super().__init__(name, bases, namespace)
+            return
+
         double_buffers = {attr for attr in bases[1].values() if isinstance(attr, double_buffer)}
         new_double_buffers = tuple(double_buffers)
         responsive_attrs = {attr for attr in bases[1].values() if isinstance(attr, _responsive)}
@@ -153,27 +229,13 @@ class _HookHandler(type):
                     getattr(self, attr._hook_name)()
                     setattr(self, attr._flag_name, False)
 
-        # TODO: Maintain priority-specified order AND after_children-specified order?
-        def recursive_refresh_responsive_attrs(self):
-            self._refresh_responsive_attrs(children_first=False)
-            for child in self._children:
-                if child.old_is_active or child.is_active:
-                    child._recursive_refresh_responsive_attrs()
-            self._refresh_responsive_attrs(children_first=True)
-
-        def recursive_call_transition_hooks(self):
-            self._call_transition_hooks()
-            for child in self._children:
-                if child.old_is_active or child.is_active:
-                    child._recursive_call_transition_hooks()
-
         setattr(cls, '_call_transition_hooks', call_transition_hooks)
-        setattr(cls, '_recursive_call_transition_hooks', recursive_call_transition_hooks)
+        setattr(cls, '_recursive_call_transition_hooks', _recursive_call_transition_hooks)
 
         setattr(cls, '_flip_transition_hooks', flip_transition_hooks)
 
         setattr(cls, '_refresh_responsive_attrs', refresh_responsive_attrs)
-        setattr(cls, '_recursive_refresh_responsive_attrs', recursive_refresh_responsive_attrs)
+        setattr(cls, '_recursive_refresh_responsive_attrs', _recursive_refresh_responsive_attrs)
 
         # Modify __init__ to initialize hook queues
         old_init = cls.__init__
@@ -183,3 +245,157 @@ class _HookHandler(type):
         cls.__init__ = new_init
 
         super().__init__(name, bases, namespace)
+
+
+# Orders the transitions of compiled classes, without keeping a queue to remove values from as they are set again
+_transition_clock = count(1)
+
+
+class _buffer_property(property):
+    pass
+
+
+def _compile_hooks(cls, bases, namespace):
+    # Double buffers and responsive attributes by name, so that a redeclared one replaces the inherited one
+    double_buffers = {}
+    responsive_attrs = {}
+    for sprcls in reversed(cls.__mro__[1:]):
+        if isinstance(sprcls, _HookHandler):
+            double_buffers.update((attr._attr_name, attr)
+                                  for attr in getattr(sprcls, _HookHandler._double_buffers_name))
+            responsive_attrs.update((attr.__name__, attr)
+                                    for attr in getattr(sprcls, _HookHandler._responsive_attrs_name))
+    new_double_buffers = []
+    for name, attr in namespace.items():
+        if isinstance(attr, double_buffer):
+            attr._attr_name = name
+            new_double_buffers.append(attr)
+    new_responsive_attrs = [attr for attr in namespace.values() if isinstance(attr, _responsive)]
+    double_buffers.update((attr._attr_name, attr) for attr in new_double_buffers)
+    responsive_attrs.update((attr.__name__, attr) for attr in new_responsive_attrs)
+
+    double_buffers = tuple(double_buffers.values())
+    responsive_attrs = tuple(sorted(responsive_attrs.values(), key=lambda a: a._priority))
+
+    setattr(cls, _HookHandler._double_buffers_name, double_buffers)
+    setattr(cls, _HookHandler._responsive_attrs_name, responsive_attrs)
+
+    # Create appropriate class attributes; slotted values are set by _init_double_buffers instead
+    slotted = getattr(cls, _HookHandler._slotted_names_name)
+    for attr in double_buffers:
+        # Including those inherited from a superclass that isn't compiled, which stores them under other names
+        if attr._slot_name not in slotted and not hasattr(cls, attr._slot_name):
+            setattr(cls, attr._slot_name, None)
+            setattr(cls, attr._prev_name, None)
+    for attr in new_double_buffers:
+        setattr(cls, attr._transition_hook_name, attr._transition_hook)
+        setattr(cls, attr._change_hook_name, attr._change_hook)
+
+    for attr in new_responsive_attrs:
+        setattr(cls, attr._flag_name, attr._initial_value)
+        setattr(cls, attr._hook_name, attr._hook)
+
+    functions = {}
+    exec(_hooks_source(double_buffers, responsive_attrs, slotted), {'_clock': _transition_clock}, functions)
+    for func in functions.values():
+        func.__qualname__ = '{}.{}'.format(cls.__qualname__, func.__name__)
+
+    # Each double buffer gets a bit of the pending transition mask, and reads go straight to its storage
+    for attr in double_buffers:
+        overridden = False
+        for sprcls in cls.__mro__:
+            if attr._attr_name in vars(sprcls):
+                overridden = not isinstance(vars(sprcls)[attr._attr_name], (double_buffer, _buffer_property))
+                break
+        if not overridden:
+            setattr(cls, attr._attr_name, _buffer_property(attrgetter(attr._slot_name),
+                                                           functions['set_{}'.format(attr._attr_name)],
+                                                           None, attr.__doc__))
+
+    for name in _HookHandler._compiled_functions:
+        if name not in namespace:
+            setattr(cls, name, functions[name])
+
+    # Don't double inject if a compiled superclass already did
+    if any(getattr(sprcls, _HookHandler._compiled_flag_name, False) for sprcls in bases):
+        return
+
+    setattr(cls, '_recursive_call_transition_hooks', _recursive_call_transition_hooks)
+    setattr(cls, '_recursive_refresh_responsive_attrs', _recursive_refresh_responsive_attrs)
+
+    # Modify __init__ to initialize storage and the pending transitions
+    old_init = cls.__init__
+    def new_init(self, *args, **kwargs):
+        self._init_double_buffers()
+        old_init(self, *args, **kwargs)
+    cls.__init__ = new_init
+
+
+def _hooks_source(double_buffers, responsive_attrs, slotted):
+    lines = []
+    for bit, attr in enumerate(double_buffers):
+        curr, prev = attr._slot_name, attr._prev_name
+        lines += ['def set_{}(self, value):'.format(attr._attr_name),
+                  '    if not self.is_loaded:',
+                  '        self.{} = value'.format(prev),
+                  '        self.{} = value'.format(curr),
+                  '        return',
+                  '    before = self.{}'.format(curr),
+                  '    self.{} = value'.format(curr),
+                  '    if value != before:',
+                  '        self.{}(before, value)'.format(attr._change_hook_name),
+                  '    if value != self.{}:'.format(prev),
+                  '        self._pending_transitions |= {}'.format(1 << bit),
+                  '        self._transition_stamps[{}] = next(_clock)'.format(bit),
+                  '        self._on_transition_queued()',
+                  '    elif self._pending_transitions & {}:'.format(1 << bit),
+                  '        self._pending_transitions &= {}'.format(~(1 << bit))]
+
+    lines += ['def _init_double_buffers(self):',
+              '    self._pending_transitions = 0',
+              '    self._transition_stamps = [0] * {}'.format(len(double_buffers)),
+              '    self._transitions_initialized = False']
+    lines += ['    self.{} = self.{} = None'.format(attr._prev_name, attr._slot_name)
+              for attr in double_buffers if attr._slot_name in slotted]
+
+    # Hooks run in the order their values were last set, as with the descriptors' queue. Hooks may set values too,
+    # which run next if they weren't run yet or were set again since, so the order is taken again after every round
+    lines += ['def _call_transition_hooks(self):',
+              '    if not self._pending_transitions or not self._transitions_initialized:',
+              '        return',
+              '    stamps = self._transition_stamps',
+              '    last = -1',
+              '    while True:',
+              '        pending = self._pending_transitions',
+              '        order = sorted((stamps[bit], bit) for bit in range({})'.format(len(double_buffers)),
+              '                       if pending >> bit & 1 and stamps[bit] > last)',
+              '        if not order:',
+              '            return',
+              '        for stamp, bit in order:',
+              '            if self._pending_transitions >> bit & 1 and stamps[bit] == stamp:']
+    for bit, attr in enumerate(double_buffers):
+        lines += ['                {} bit == {}:'.format('elif' if bit else 'if', bit),
+                  '                    self.{}()'.format(attr._transition_hook_name)]
+    lines += ['                last = stamp']
+
+    lines += ['def _flip_transition_hooks(self):',
+              '    self._transitions_initialized = True',
+              '    pending = self._pending_transitions',
+              '    if not pending:',
+              '        return']
+    for bit, attr in enumerate(double_buffers):
+        lines += ['    if pending & {}:'.format(1 << bit),
+                  '        self.{} = self.{}'.format(attr._prev_name, attr._slot_name)]
+    lines += ['    self._pending_transitions = 0']
+
+    lines += ['def _refresh_responsive_attrs(self, children_first):']
+    for children_first in (True, False):
+        lines += ['    if children_first:' if children_first else '    else:']
+        attrs = [attr for attr in responsive_attrs if attr._children_first == children_first]
+        for attr in attrs:
+            lines += ['        if self.{}:'.format(attr._flag_name),
+                      '            self.{}()'.format(attr._hook_name),
+                      '            self.{} = False'.format(attr._flag_name)]
+        if not attrs:
+            lines += ['        pass']
+    return '\n'.join(lines) + '\n'
@@ -22,6 +22,7 @@ from .menu import Menu
 from .button import Button, LabeledButton
 from .text_entry import TextEntryBox, TextField
 from .text import Text, TextBox
+from .frame import TextFrame
 from .image import Image
 from .drag import DragWidget, SlideWidget
 from .widget import SimpleWidget, Widget
@@ -33,7 +34,7 @@ __all__ = [
     'Menu',
     'Button', 'LabeledButton',
     'TextEntryBox', 'TextField',
-    'Text', 'TextBox',
+    'Text', 'TextBox', 'TextFrame',
     'Image',
     'DragWidget', 'SlideWidget',
     'SimpleWidget', 'Widget',
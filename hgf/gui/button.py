@@ -34,7 +34,7 @@ class Button(SimpleWidget):
 
     def refresh_background(self):
         super().refresh_background()
-        self.background = self._bg_factory(self.size, self.mouse_state)
+        self.background = self._make_background(self._bg_factory, self.size, self.mouse_state)
 
     def on_mouse_state_change(self, before, after):
         super().on_mouse_state_change(before, after)
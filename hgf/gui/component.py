@@ -18,12 +18,21 @@
 
 import pygame
 
+import threading
+import weakref
+
 from hgf.double_buffer import double_buffer, responsive
 from ..component import Component
-from ..util import Rect, keyboard
+from ..util import Rect, GeometryStore, keyboard
+from ..util.alpha import BLEND_PREMULTIPLIED, premultiplied, premultiply_color
+from ..util.blit import blits
 
 
 class GraphicalComponent(Rect, Component):
+    # Held while using backgrounds from output threads, since they may be shared with other components (through the
+    # text and background caches, or as regions of one atlas page) and every blit from a surface updates its blit map
+    _shared_surface_lock = threading.RLock()
+
     def __init__(self,
                  x=0, y=0, w=0, h=0, z=0,
                  show=True, hover=True, solid=True, click=True,
@@ -48,9 +57,18 @@ class GraphicalComponent(Rect, Component):
         self._bgcolor = bgcolor
         self._background = None
 
+        # The background last fetched from the app's cache, which other components share under the same colorkey
+        self._shared_background = None
+
+        # Whether this component's background hides everything beneath it, or None if unknown since it last changed
+        self._covers = None
+
         # Dirty state
         self._dirty_flag = True
 
+        # Row in the app's geometry store, if it has one
+        self._geometry_id = None
+
         self._graphical_children = []
         self.z = z
 
@@ -72,21 +90,43 @@ class GraphicalComponent(Rect, Component):
     def refresh_background(self): pass
 
     @double_buffer
-    class w: pass
+    class w:
+        def on_change(self, before, after):
+            if self._geometry_id is not None:
+                self._set_geometry(GeometryStore.W, after)
+            if not self.is_root:
+                self.parent._invalidate_draw_list()
 
     @double_buffer
-    class h: pass
+    class h:
+        def on_change(self, before, after):
+            if self._geometry_id is not None:
+                self._set_geometry(GeometryStore.H, after)
+            if not self.is_root:
+                self.parent._invalidate_draw_list()
 
     @double_buffer
     class x:
         def on_transition(self):
             self._set_dirty(True)
 
+        def on_change(self, before, after):
+            if self._geometry_id is not None:
+                self._set_geometry(GeometryStore.X, after)
+            if not self.is_root:
+                self.parent._invalidate_draw_list()
+
     @double_buffer
     class y:
         def on_transition(self):
             self._set_dirty(True)
 
+        def on_change(self, before, after):
+            if self._geometry_id is not None:
+                self._set_geometry(GeometryStore.Y, after)
+            if not self.is_root:
+                self.parent._invalidate_draw_list()
+
     @double_buffer
     class z:
         def on_transition(self):
@@ -112,7 +152,15 @@ class GraphicalComponent(Rect, Component):
     @colorkey.setter
     def colorkey(self, other):
         self._colorkey = other
-        self._background.set_colorkey(other)
+        self._covers = None
+        self._rekey_background()
+
+    def _rekey_background(self):
+        # A shared background is fetched again under the new colorkey, instead of changing it for every component
+        if self._background is not None and self._background is self._shared_background:
+            self.refresh_background_flag = True
+        else:
+            self._apply_colorkey(self._background)
 
     @property
     def background(self):
@@ -120,13 +168,32 @@ class GraphicalComponent(Rect, Component):
 
     @background.setter
     def background(self, other):
+        other = self._premultiply(other)
         if self._background is None or self._background.get_size() != other.get_size():
             self.size = other.get_size()
         self._background = other
+        self._covers = None
         if self._colorkey is not None:
-            self._background.set_colorkey(self._colorkey)
+            self._apply_colorkey(self._background)
         self._set_dirty(True)
 
+    @property
+    def _is_premultiplied(self):
+        # In premultiplied alpha mode every surface with per-pixel alpha is premultiplied, and blended as such
+        return self._app is not None and self._app._premultiplied
+
+    def _premultiply(self, surface):
+        if self._is_premultiplied and surface.get_flags() & pygame.SRCALPHA:
+            return premultiplied(surface)
+        return surface
+
+    def _apply_colorkey(self, surface):
+        # Premultiplied surfaces are blended, so they need no colorkey
+        if self._is_premultiplied and surface.get_flags() & pygame.SRCALPHA:
+            surface.set_colorkey(None)
+        else:
+            surface.set_colorkey(self._colorkey)
+
     def on_is_visible_transition(self):
         super().on_is_visible_transition()
         self._set_dirty(True)
@@ -135,7 +202,58 @@ class GraphicalComponent(Rect, Component):
         super().on_is_active_transition()
         self._set_dirty(True)
 
+    def on_is_visible_change(self, before, after):
+        if not self.is_root:
+            self.parent._invalidate_draw_list()
+
+    def on_is_active_change(self, before, after):
+        if not self.is_root:
+            self.parent._invalidate_draw_list()
+
+    def load(self):
+        super().load()
+        if not self.is_root:
+            self.parent._invalidate_draw_list()
+        self._join_geometry()
+
+    def _join_geometry(self):
+        store = None if self._app is None else self._app._geometry
+        if store is None or self._geometry_id is not None:
+            return
+        if self.is_root:
+            parent_id = -1
+        elif self.parent._geometry_id is None:
+            # The parent brings its whole subtree along when it joins
+            return
+        else:
+            parent_id = self.parent._geometry_id
+        self._geometry_id = store.add(self, parent_id)
+        for child in self._graphical_children:
+            if child.is_loaded:
+                child._join_geometry()
+
+    def _leave_geometry(self, store):
+        if self._geometry_id is None:
+            return
+        for child in self._graphical_children:
+            child._leave_geometry(store)
+        store.remove(self._geometry_id)
+        self._geometry_id = None
+
+    def _set_geometry(self, column, value):
+        self._app._geometry.set(self._geometry_id, column, value)
+
+    def _make_background(self, factory, *args):
+        # Backgrounds are shared between components, so they must never be drawn on
+        key = factory, args, self._colorkey
+        self._shared_background = self._app._backgrounds.get(key, lambda: self._premultiply(factory(*args)))
+        return self._shared_background
+
     def abs_pos(self):
+        if self._geometry_id is not None:
+            pos = self._app._geometry.abs_pos(self._geometry_id)
+            if pos is not None:
+                return pos
         if self.is_root:
             return self.pos
         px, py = self.parent.abs_pos()
@@ -174,6 +292,9 @@ class GraphicalComponent(Rect, Component):
     def _transition_rects(self):
         if self.old_is_active and self.is_active and self.old_is_visible and self.is_visible:
             old = Rect(self.old_x, self.old_y, self.old_w, self.old_h)
+            if self._geometry_id is not None and self._app._geometry.is_prepared:
+                bounds = self._app._geometry.transition_bounds(self._geometry_id)
+                return [old, Rect.copy(self)] if bounds is None else [Rect(*bounds)]
             comb = Rect(min(self.x, old.x), min(self.y, old.y))
             comb.w = max(self.right, old.right) - comb.x
             comb.h = max(self.bottom, old.bottom) - comb.y
@@ -188,8 +309,25 @@ class GraphicalComponent(Rect, Component):
         return []
 
     def _set_dirty(self, other):
+        if other and not self._dirty_flag:
+            self.invalidate_cache()
         self._dirty_flag = other
 
+    def _is_cover(self):
+        # Whether blitting this component hides everything beneath it
+        if self._covers is None:
+            with GraphicalComponent._shared_surface_lock:
+                if self._background is self._shared_background:
+                    self._covers = _shared_covers(self._background)
+                else:
+                    self._covers = _covers(self._background)
+        return self._covers
+
+    def _repaint(self):
+        self._set_dirty(True)
+        for child in self._graphical_children:
+            child._repaint()
+
     def _step_reset(self):
         self._dirty_rects = []
         self._dirty_area = 0
@@ -229,27 +367,54 @@ class FlatComponent(GraphicalComponent):
 
 
 class LayeredComponent(GraphicalComponent):
-    def __init__(self, **kwargs):
+    # Past this many visible pieces of a dirty rect, children stop being culled against each other
+    OCCLUSION_LIMIT = 16
+
+    # Held while dirty rects are passed up to shared ancestors, since siblings may be output in parallel
+    _output_lock = threading.RLock()
+
+    def __init__(self, flatten=False, cache_bitmap=False, **kwargs):
         super().__init__(**kwargs)
+        if flatten and not self.is_opaque:
+            raise ValueError('Cannot flatten non-opaque component: {}'.format(self.__class__.__name__))
+        if flatten and cache_bitmap:
+            raise ValueError('Cannot cache flattened component as bitmap: {}'.format(self.__class__.__name__))
+        # Flattened components have no display of their own, and are composited directly into their parent's
+        self._flatten = flatten
+
+        # Cached components stop refreshing and drawing their subtree until something in it changes
+        self._cache_bitmap = cache_bitmap
+        self._cache_valid = False
         self._display = None
         self._dirty_area = 0
         self._dirty_rects = []
 
+        # Visible descendants drawn into this component's display, in draw order, with their offsets
+        self._draw_list = None
+
     @responsive(init=True, priority=-1)
     def refresh_proportions(self):
+        self.invalidate_cache()
+        self._covers = None
         if self.is_translucent:
-            self._background = pygame.Surface(self.size, pygame.SRCALPHA)
-            self._display = pygame.Surface(self.size, pygame.SRCALPHA)
+            self._background = self._replace_surface(self._background, pygame.SRCALPHA)
+            self._display = self._replace_display(pygame.SRCALPHA)
+        elif self._flatten:
+            self._background = self._replace_surface(self._background)
         elif self.is_opaque:
-            self._background = pygame.Surface(self.size)
-            self._display = pygame.Surface(self.size)
+            self._background = self._replace_surface(self._background)
+            self._display = self._replace_display()
         if self._colorkey is not None:
-            self._background.set_colorkey(self._colorkey)
-            self._display.set_colorkey(self._colorkey)
+            self._apply_colorkey(self._background)
+            if self._display is not None:
+                self._apply_colorkey(self._display)
             if self.is_opaque and self._bgcolor is None:
                 self._bgcolor = (255, 255, 255)
         if not self.is_transparent and self._bgcolor is not None:
-            self._background.fill(self._bgcolor)
+            if self.is_translucent and self._is_premultiplied:
+                self._background.fill(premultiply_color(self._bgcolor))
+            else:
+                self._background.fill(self._bgcolor)
 
     @responsive(init=True, children_first=True)
     def refresh_layout(self): pass
@@ -260,23 +425,44 @@ class LayeredComponent(GraphicalComponent):
             raise ValueError('Cannot set background for transparent component: {}'.format(self))
         if self.is_opaque and (other.get_flags() & pygame.SRCALPHA or other.get_alpha() is not None):
             raise ValueError('Cannot set translucent background for opaque component: {}'.format(self))
+        other = self._premultiply(other)
         if self._background.get_size() != other.get_size():
             self.size = other.get_size()
             if self.is_translucent:
-                self._display = pygame.Surface(other.get_size(), pygame.SRCALPHA)
-            elif self.is_opaque:
-                self._display = pygame.Surface(other.get_size())
+                self._display = self._replace_display(pygame.SRCALPHA)
+            elif self.is_opaque and not self._flatten:
+                self._display = self._replace_display()
         if self._colorkey is not None:
-            self._background.set_colorkey(self._colorkey)
-            self._display.set_colorkey(self._colorkey)
+            self._apply_colorkey(self._background)
+            if self._display is not None:
+                self._apply_colorkey(self._display)
+        if other is not self._background:
+            self._release_surface(self._background)
         self._background = other
+        self._covers = None
         self._set_dirty(True)
 
+    def _replace_surface(self, old, flags=0):
+        # Buffers are reused through the app's surface pool as components are resized
+        self._release_surface(old)
+        if self._app is None:
+            return pygame.Surface(self.size, flags)
+        return self._app._surfaces.acquire(self.size, flags)
+
+    def _replace_display(self, flags=0):
+        return self._replace_surface(self._display, flags)
+
+    def _release_surface(self, surface):
+        if self._app is not None:
+            self._app._surfaces.release(surface)
+
     @GraphicalComponent.colorkey.setter
     def colorkey(self, other):
         self._colorkey = other
-        self._background.set_colorkey(other)
-        self._display.set_colorkey(other)
+        self._covers = None
+        self._rekey_background()
+        if self._display is not None:
+            self._apply_colorkey(self._display)
 
     def on_w_transition(self):
         self.refresh_proportions_flag = True
@@ -287,15 +473,119 @@ class LayeredComponent(GraphicalComponent):
     def _on_child_changed_z(self, child):
         self._graphical_children.remove(child)
         for i, other in enumerate(self._graphical_children):
-            if other.z > child.z:
+            if child.z > other.z:
                 self._graphical_children.insert(i, child)
-        self._graphical_children.append(child)
+                break
+        else:
+            self._graphical_children.append(child)
+        self._invalidate_draw_list()
+
+    @property
+    def _is_cached(self):
+        return self._cache_bitmap and self._cache_valid
+
+    def invalidate_cache(self):
+        # An invalid cache means every ancestor's was already invalidated too
+        if self._cache_valid:
+            self._cache_valid = False
+            super().invalidate_cache()
+
+    def _recursive_call_transition_hooks(self):
+        if self._is_cached:
+            self._call_transition_hooks()
+        else:
+            super()._recursive_call_transition_hooks()
+
+    def _recursive_refresh_responsive_attrs(self):
+        if self._is_cached:
+            self._refresh_responsive_attrs(children_first=False)
+            self._refresh_responsive_attrs(children_first=True)
+        else:
+            super()._recursive_refresh_responsive_attrs()
+
+    def _output_children(self):
+        if self._is_cached:
+            return
+        clips_children = self._clips_children
+        store = self._prepared_geometry() if clips_children and self._graphical_children else None
+        if store is not None:
+            culled, was_outside = store.culled, store.was_outside
+        for child in super()._output_children():
+            if isinstance(child, GraphicalComponent) and clips_children:
+                if store is not None and child._geometry_id is not None:
+                    if culled[child._geometry_id]:
+                        continue
+                    repaint = was_outside[child._geometry_id]
+                elif self._is_culled(child):
+                    continue
+                else:
+                    repaint = _outside(child.old_x, child.old_y, child.old_w, child.old_h, self.old_w, self.old_h)
+                # Nothing was drawn while the child was out of view
+                if repaint:
+                    child._repaint()
+            yield child
+
+    def _recursive_step_reset(self):
+        if self._is_cached:
+            self._step_reset()
+        else:
+            super()._recursive_step_reset()
+            self._cache_valid = True
+
+    @property
+    def _clips_children(self):
+        # Transparent and flattened components don't have a display to clip their children to
+        return not self.is_transparent and not self._flatten
+
+    def _prepared_geometry(self):
+        # The app's geometry store, if it has culled every component in one batch since anything last changed
+        store = None if self._app is None else self._app._geometry
+        return store if store is not None and store.is_prepared else None
+
+    def _is_culled(self, child):
+        # Children that were and still are outside of the display can't be seen, so aren't drawn at all
+        return (_outside(child.x, child.y, child.w, child.h, self.w, self.h)
+                and _outside(child.old_x, child.old_y, child.old_w, child.old_h, self.old_w, self.old_h))
+
+    def _invalidate_draw_list(self):
+        # Called when children are registered, unregistered or loaded, and when a child changes position, size,
+        # visibility, activity or z, since entries hold offsets and the clip rects of flattened ancestors
+        self._draw_list = None
+        # Transparent and flattened components are drawn by their parent, along with their children
+        if not self.is_root and (self.is_transparent or self._flatten):
+            self.parent._invalidate_draw_list()
+
+    def _get_draw_list(self):
+        if self._draw_list is None:
+            self._draw_list = []
+            self._extend_draw_list(self._draw_list, self, 0, 0)
+        return self._draw_list
+
+    def _extend_draw_list(self, draw_list, parent, x, y, clip=None):
+        # `clip` bounds the children of flattened components to their rect, as a display of their own would
+        for child in parent._graphical_children:
+            if child.is_active and child.is_visible:
+                child_x, child_y = x + child.x, y + child.y
+                if not child.is_transparent:
+                    draw_list.append((child_x, child_y, child, clip))
+                if child.is_transparent:
+                    self._extend_draw_list(draw_list, child, child_x, child_y, clip)
+                elif child._display is None:
+                    child_clip = child_x, child_y, child_x + child.w, child_y + child.h
+                    if clip is not None:
+                        child_clip = (max(child_clip[0], clip[0]), max(child_clip[1], clip[1]),
+                                      min(child_clip[2], clip[2]), min(child_clip[3], clip[3]))
+                    self._extend_draw_list(draw_list, child, child_x, child_y, child_clip)
 
     def register(self, *children):
         super().register(*children)
+        self._invalidate_draw_list()
+        self.invalidate_cache()
         for child in children:
             if isinstance(child, GraphicalComponent):
                 child._set_dirty(True)
+                if child.is_loaded:
+                    child._join_geometry()
                 for i, other in enumerate(self._graphical_children):
                     if child.z > other.z:
                         self._graphical_children.insert(i, child)
@@ -310,6 +600,10 @@ class LayeredComponent(GraphicalComponent):
                 if child.old_is_active and child.old_is_visible:
                     self._add_dirty_rect(Rect(child.old_x, child.old_y, child.old_w, child.old_h))
                 self._graphical_children.remove(child)
+                if self._app is not None and self._app._geometry is not None:
+                    child._leave_geometry(self._app._geometry)
+        self._invalidate_draw_list()
+        self.invalidate_cache()
 
     def _key_down(self, unicode, key, mod):
         super()._key_down(unicode, key, mod)
@@ -369,38 +663,98 @@ class LayeredComponent(GraphicalComponent):
         if not self.is_root:
             self.parent._clean_dirty_rects(Rect(self.x + rect.x, self.y + rect.y, rect.w, rect.h))
 
-    def _redraw_area(self, rect):
+    def _redraw_background(self, rect):
         pyrect = rect.as_pygame_rect()
         if self.is_translucent:
             self._display.fill(self.colorkey, pyrect)
-        self._display.blit(self._background, rect.pos, pyrect)
-        can_see = lambda child: child.is_active and child.is_visible
-        children = [(c.pos, c) for c in self._graphical_children if can_see(c)]
-        for pos, child in children:
-            if child.is_transparent:
-                children.extend(((pos[0] + c.x, pos[1] + c.y), c) for c in child._graphical_children if can_see(c))
-                continue
-            area = rect.intersect(Rect(*pos, child.w, child.h))
-            if area is None or area.w <= 0 or area.h <= 0:
+        self._display.blit(self._background, rect.pos, pyrect, _blend_flags(self._background, self._is_premultiplied))
+
+    def _is_cover(self):
+        if self._display is None:
+            return super()._is_cover()
+        if self._display.get_alpha() is not None or self._display.get_flags() & pygame.SRCALPHA:
+            return False
+        colorkey = self._display.get_colorkey()
+        if colorkey is None:
+            return True
+        # Instead of scanning the display after every redraw: the key colour can only be drawn into it by the
+        # background, which is checked once, or by descendants that aren't keyed with it themselves
+        return super()._is_cover() and all(_is_keyed(child._background if child._display is None else child._display,
+                                                     colorkey)
+                                           for x, y, child, clip in self._get_draw_list())
+
+    def _redraw_area(self, rect):
+        # Walk front to back, removing the areas covered by opaque children from what is still visible
+        premultiplied = self._is_premultiplied
+        visible = [(rect.x, rect.y, rect.right, rect.bottom)]
+        sequence = []
+        shared = []
+        for x, y, child, clip in reversed(self._get_draw_list()):
+            left, top, right, bottom = x, y, x + child.w, y + child.h
+            if clip is not None:
+                left, top, right, bottom = (max(left, clip[0]), max(top, clip[1]),
+                                            min(right, clip[2]), min(bottom, clip[3]))
+            area = None
+            for piece in visible:
+                if piece[0] < right and left < piece[2] and piece[1] < bottom and top < piece[3]:
+                    area = piece if area is None else (min(area[0], piece[0]), min(area[1], piece[1]),
+                                                       max(area[2], piece[2]), max(area[3], piece[3]))
+            if area is None:
                 continue
-            self._display.blit(child._display,
-                               area.pos,
-                               pygame.Rect(area.x - pos[0],
-                                           area.y - pos[1],
-                                           area.w,
-                                           area.h))
+            area = max(area[0], left), max(area[1], top), min(area[2], right), min(area[3], bottom)
+            source = child._background if child._display is None else child._display
+            sequence.append((source,
+                             area[:2],
+                             (area[0] - x, area[1] - y, area[2] - area[0], area[3] - area[1]),
+                             _blend_flags(source, premultiplied)))
+            # Only displays are never shared, since each is blitted by the one parent
+            shared.append(child._display is None)
+            if len(visible) < LayeredComponent.OCCLUSION_LIMIT and child._is_cover():
+                visible = [remainder for piece in visible
+                           for remainder in _subtract(piece, left, top, right, bottom)]
+                if not visible:
+                    break
+
+        with GraphicalComponent._shared_surface_lock:
+            for left, top, right, bottom in visible:
+                self._redraw_background(Rect(left, top, right - left, bottom - top))
+        sequence.reverse()
+        shared.reverse()
+        start = 0
+        for end in range(1, len(sequence) + 1):
+            # Runs of blits from displays go without the lock
+            if end == len(sequence) or shared[end] != shared[start]:
+                if shared[start]:
+                    with GraphicalComponent._shared_surface_lock:
+                        blits(self._display, sequence[start:end])
+                else:
+                    blits(self._display, sequence[start:end])
+                start = end
 
     def _step_output(self):
         super()._step_output()
+        # Nothing in a cached subtree has changed, so the display is already up to date
+        if self._is_cached:
+            return self._dirty_flag or self._dirty_rects
+
         # Identify dirty rectangles
         if not self._dirty_flag:
-            for child in self._graphical_children:
-                if (child.old_is_active and child.old_is_visible or child.is_active and child.is_visible) and child._dirty_flag:
-                    for rect in child._transition_rects():
-                        self._add_dirty_rect(rect)
+            clips_children = self._clips_children
+            store = self._prepared_geometry() if clips_children else None
+            culled = None if store is None else store.culled
+            with self._output_lock:
+                for child in self._graphical_children:
+                    if (child.old_is_active and child.old_is_visible or child.is_active and child.is_visible) and child._dirty_flag:
+                        if culled is not None and child._geometry_id is not None:
+                            if culled[child._geometry_id]:
+                                continue
+                        elif clips_children and self._is_culled(child):
+                            continue
+                        for rect in child._transition_rects():
+                            self._add_dirty_rect(rect)
 
         # Redraw dirty rectangles
-        if not self.is_transparent:
+        if not self.is_transparent and not self._flatten:
             if self._dirty_flag:
                 self._redraw_area(self.rel_rect())
             else:
@@ -408,3 +762,59 @@ class LayeredComponent(GraphicalComponent):
                     self._redraw_area(rect)
 
         return self._dirty_flag or self._dirty_rects
+
+
+def _blend_flags(source, premultiplied):
+    if premultiplied and source.get_flags() & pygame.SRCALPHA:
+        return BLEND_PREMULTIPLIED
+    return 0
+
+
+def _outside(x, y, w, h, bounds_w, bounds_h):
+    return x >= bounds_w or y >= bounds_h or x + w <= 0 or y + h <= 0
+
+
+def _covers(surface):
+    # Whether blitting the surface replaces every pixel beneath it
+    if surface.get_alpha() is not None or surface.get_flags() & pygame.SRCALPHA:
+        return False
+    if surface.get_colorkey() is None:
+        return True
+    # Opaque components have a colorkey by default, but it only matters if the key colour is actually drawn
+    return pygame.mask.from_surface(surface).count() == surface.get_width() * surface.get_height()
+
+
+# Shared backgrounds are never drawn on, so each is only scanned once however often components swap between them
+_shared_cover_scans = weakref.WeakKeyDictionary()
+
+
+def _shared_covers(surface):
+    colorkey = surface.get_colorkey()
+    scan = _shared_cover_scans.get(surface)
+    if scan is None or scan[0] != colorkey:
+        scan = _shared_cover_scans[surface] = colorkey, _covers(surface)
+    return scan[1]
+
+
+def _is_keyed(surface, colorkey):
+    # Whether blitting the surface skips every pixel of the key colour
+    return (surface.get_alpha() is None and not surface.get_flags() & pygame.SRCALPHA
+            and surface.get_colorkey() == colorkey)
+
+
+def _subtract(piece, left, top, right, bottom):
+    # The parts of `piece` outside of the given edges, as at most 4 disjoint pieces
+    piece_left, piece_top, piece_right, piece_bottom = piece
+    if left >= piece_right or right <= piece_left or top >= piece_bottom or bottom <= piece_top:
+        return [piece]
+    remainders = []
+    if top > piece_top:
+        remainders.append((piece_left, piece_top, piece_right, top))
+    if bottom < piece_bottom:
+        remainders.append((piece_left, bottom, piece_right, piece_bottom))
+    middle_top, middle_bottom = max(top, piece_top), min(bottom, piece_bottom)
+    if left > piece_left:
+        remainders.append((piece_left, middle_top, left, middle_bottom))
+    if right < piece_right:
+        remainders.append((right, middle_top, piece_right, middle_bottom))
+    return remainders
@@ -33,7 +33,7 @@ class DragWidget(FlatComponent):
         self._bg_factory = self.style_get('background')
 
     def refresh_background(self):
-        self.background = self._bg_factory(self.size)
+        self.background = self._make_background(self._bg_factory, self.size)
 
     def on_mouse_down(self, pos, button, hovered):
         super().on_mouse_down(pos, button, hovered)
@@ -73,7 +73,7 @@ class SlideWidget(SimpleWidget):
         self._bg_factory = self.style_get('background')
 
     def refresh_background(self):
-        self.background = self._bg_factory(self.size)
+        self.background = self._make_background(self._bg_factory, self.size)
 
     def on_mouse_motion(self, start, end, buttons, start_hovered, end_hovered):
         super().on_mouse_motion(start, end, buttons, start_hovered, end_hovered)
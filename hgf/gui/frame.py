@@ -18,7 +18,11 @@
 
 from .drag import SlideWidget
 from .widget import SimpleWidget
+from .text import Text, TextBox
 from .component import LayeredComponent
+from ..util import Rect
+
+import math
 
 
 # TODO
@@ -42,5 +46,161 @@ class Frame(LayeredComponent):
         super().__init__(**kwargs)
 
 
-# TODO
-# class TextFrame
+class _TextPage(LayeredComponent):
+    def __init__(self, **kwargs):
+        # Translucent rather than transparent: the page needs a display of its own to scroll, and its colorkey
+        # lets the frame's background show through around the lines
+        super().__init__(opacity=1, hover=False, solid=False, click=False, **kwargs)
+
+        # Pixels to scroll the display by during the next output
+        self._shift = 0
+
+    def style_get(self, *args):
+        return self.parent.style_get(*args)
+
+    def refresh_proportions(self):
+        super().refresh_proportions()
+        self._set_dirty(True)
+
+    def _outside(self, y, h):
+        return y + h <= 0 or y >= self.h
+
+    def _step_output(self):
+        shift, self._shift = self._shift, 0
+        for line in self._graphical_children:
+            # Overscan lines are never seen
+            if line._dirty_flag and self._outside(line.y, line.h) and self._outside(line.old_y, line.old_h):
+                line._set_dirty(False)
+
+        if shift and not self._dirty_flag:
+            if abs(shift) >= self.h:
+                with self._output_lock:
+                    self._set_dirty(True)
+            else:
+                # Move the pixels of lines that only scrolled instead of redrawing them
+                self._display.scroll(0, shift)
+                for line in self._graphical_children:
+                    if line.text == line.old_text and line.x == line.old_x and line.y - line.old_y == shift:
+                        line._set_dirty(False)
+                if shift > 0:
+                    self._redraw_area(Rect(0, 0, self.w, shift))
+                else:
+                    self._redraw_area(Rect(0, self.h + shift, self.w, -shift))
+                if not self.is_root:
+                    with self._output_lock:
+                        self.parent._add_dirty_rect(Rect.copy(self))
+        return super()._step_output()
+
+
+class TextFrame(TextBox):
+    OVERSCAN = 2
+    SCROLL_LINES = 3
+
+    def __init__(self, **kwargs):
+        super().__init__(composite=False, **kwargs)
+        self._page = None
+
+        # Top visible row of the wrapped text
+        self._scroll_row = 0
+
+    @property
+    def scroll_row(self):
+        return self._scroll_row
+
+    @property
+    def max_scroll_row(self):
+        return max(self._num_active_lines - (self.h - 2 * self.margin) // self.line_height, 0)
+
+    def on_load(self):
+        super().on_load()
+        self._page = _TextPage()
+        self.register_load(self._page)
+
+    def on_mouse_down(self, pos, button, hovered):
+        super().on_mouse_down(pos, button, hovered)
+        if hovered and button == 4:
+            self.scroll_by(-TextFrame.SCROLL_LINES)
+        elif hovered and button == 5:
+            self.scroll_by(TextFrame.SCROLL_LINES)
+
+    def on_justify_transition(self):
+        self._dirty_rows.update(range(*self._window()))
+        self.refresh_layout_flag = True
+
+    def refresh_layout(self):
+        self.set_text(self.text)
+        first, stop = self._window()
+        for row in self._dirty_rows:
+            if first <= row < stop:
+                self._place_line(row)
+        self._dirty_rows.clear()
+
+    def scroll_to(self, row):
+        row = min(max(row, 0), self.max_scroll_row)
+        if row == self._scroll_row:
+            return
+        self._page._shift += (self._scroll_row - row) * self.line_height
+        self._scroll_row = row
+        self._fill_window()
+        self._dirty_rows.update(range(*self._window()))
+        self.refresh_layout_flag = True
+
+    def scroll_by(self, rows):
+        self.scroll_to(self._scroll_row + rows)
+
+    def _make_lines(self):
+        self._page.pos = self.margin, self.margin
+        self._page.w = self.w - 2 * self.margin
+        self._page.h = self.h - 2 * self.margin
+        self._page.refresh_proportions_flag = True
+
+        # Enough lines to cover the view and the overscan on either side
+        count = math.ceil(self._page.h / self.line_height) + 2 * TextFrame.OVERSCAN
+        self._page.unregister(*self.lines)
+        self.lines = [Text('', parent_style=True) for _ in range(count)]
+        self._page.register_load(*self.lines)
+
+    def _window(self):
+        # Range of rows with a line, each of which is displayed by `lines[row % len(lines)]`
+        first = max(self._scroll_row - TextFrame.OVERSCAN, 0)
+        return first, first + len(self.lines)
+
+    def _fill_window(self):
+        for row in range(*self._window()):
+            if row < len(self._spans):
+                start, end = self._spans[row]
+                line_text = self.text[start:end]
+            else:
+                line_text = ''
+            line = self.lines[row % len(self.lines)]
+            if line.text != line_text:
+                line.text = line_text
+                self._dirty_rows.add(row)
+        if self._dirty_rows:
+            self.refresh_layout_flag = True
+
+    def _set_text(self, text, edit=None):
+        spans, _, _ = self._rewrap(text, edit)
+        self._store_wrap(text, spans)
+        if self._scroll_row > self.max_scroll_row:
+            self.scroll_to(self.max_scroll_row)
+        else:
+            self._fill_window()
+        return True
+
+    def _place_line(self, row):
+        line = self.lines[row % len(self.lines)]
+        if self.justify == 'left':
+            line.left = 0
+        elif self.justify == 'center':
+            line.midx = self._page.relmidx
+        else:
+            line.right = self._page.relright
+        line.y = (row - self._scroll_row) * self.line_height
+
+    def _row_height(self, row):
+        return self.margin + (row - self._scroll_row) * self.line_height
+
+    def _row_text(self, row):
+        start, end = self._spans[row]
+        return self.text[start:end]
@@ -18,10 +18,55 @@
 
 from hgf.double_buffer import double_buffer
 from .component import FlatComponent, LayeredComponent
+from ..util import Rect
+from ..util.alpha import BLEND_PREMULTIPLIED, premultiply
+from ..util.font import GlyphAtlas
+
+import bisect
+import math
+
+
+def _common_prefix(a, b):
+    lo = 0
+    hi = min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    lo = 0
+    hi = limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _render(app, font, fgcolor, text, glyph_atlas=False, colorkey=None):
+    # `font` is a SizedFont handle from the app's font manager
+    if glyph_atlas:
+        key = font, tuple(fgcolor)
+        atlas = app._glyph_atlases.get(key, lambda: GlyphAtlas(font, fgcolor, app._premultiplied))
+        return atlas.render(text)
+
+    # Cached surfaces are shared between Texts, so they must never be drawn on. The colorkey is part of the key
+    # because setting it changes how the surface blits for every Text that shares it
+    key = font, tuple(fgcolor), text, None if colorkey is None else tuple(colorkey)
+    if app._premultiplied:
+        return app._text_cache.get(key, lambda: premultiply(font.render(text, fgcolor)[0]))
+    return app._text_cache.get(key, lambda: font.render(text, fgcolor)[0])
 
 
 class Text(FlatComponent):
-    def __init__(self, text='', font=None, fontsize=14, fgcolor=None, parent_style=False, **kwargs):
+    def __init__(self, text='', font=None, fontsize=14, fgcolor=None, parent_style=False, glyph_atlas=False, **kwargs):
         super().__init__(hover=False, solid=False, click=False, opacity=1, **kwargs)
         self.text = text
         self.font = font
@@ -30,6 +75,9 @@ class Text(FlatComponent):
         self.fgcolor = (0, 0, 0) if fgcolor is None else fgcolor
         self._parent_style = parent_style
 
+        # Compose from cached glyphs rather than rendering the whole string (for text that changes often)
+        self._glyph_atlas = glyph_atlas
+
     def load_style(self):
         if self._parent_style:
             self.font = self.parent.style_get('font')
@@ -37,37 +85,48 @@ class Text(FlatComponent):
             self.font = self.style_get('font')
 
     def refresh_background(self):
-        self.background = self.font.render(self.text, fgcolor=self.fgcolor, size=self.fontsize)[0]
+        background = _render(self._app, self.sized_font, self.fgcolor, self.text, self._glyph_atlas, self._colorkey)
+
+        # Only a change in size can move anything else, other changes just redraw this Text
+        if background.get_size() != self.size and not self.is_root:
+            self.parent.refresh_layout_flag = True
+        self.background = background
+
+    @FlatComponent.colorkey.setter
+    def colorkey(self, other):
+        # The background may be shared through the text cache, so render one with the new colorkey instead
+        self._colorkey = other
+        self.refresh_background_flag = True
+
+    @property
+    def sized_font(self):
+        return self._app._fonts.get(self.font, self.fontsize)
 
     @double_buffer
     class text:
         def on_transition(self):
-            self.parent.refresh_layout_flag = True
             self.refresh_background_flag = True
 
     @double_buffer
     class font:
         def on_transition(self):
-            self.parent.refresh_layout_flag = True
             self.refresh_background_flag = True
 
     @double_buffer
     class fontsize:
         def on_transition(self):
-            self.parent.refresh_layout_flag = True
             self.refresh_background_flag = True
 
     @double_buffer
     class fgcolor:
         def on_transition(self):
-            self.parent.refresh_layout_flag = True
             self.refresh_background_flag = True
 
     def get_metrics(self):
-        return self.font.get_metrics(self.text, self.fontsize)
+        return self.sized_font.get_metrics(self.text)
 
     def get_rect(self, text=None):
-        return self.font.get_rect(self.text if text is None else text, size=self.fontsize)
+        return self.sized_font.get_rect(self.text if text is None else text)
 
     def __repr__(self):
         return 'Text(\'{}\')'.format(self.text)
@@ -75,16 +134,29 @@ class Text(FlatComponent):
     __str__ = __repr__
 
 
+class _TextLine(Rect):
+    # A line of a composited TextBox, drawn straight onto the box's display
+    def __init__(self):
+        super().__init__()
+        self.text = ''
+        self.surface = None
+
+
 class TextBox(LayeredComponent):
-    def __init__(self, text='', justify='left', margin=3, **kwargs):
+    def __init__(self, text='', justify='left', margin=3, composite=False, **kwargs):
         super().__init__(opacity=1, **kwargs)
         self.type = 'text-box'
         self._bg_factory = None
 
+        # Draw the lines onto this component's own display instead of giving each line a Text
+        self._composite = composite
+
         self.margin = margin
         self.justify = justify
         self.font = None
+        self.fontsize = None
         self.fgcolor = None
+        self._sized_font = None
 
         self.text = text
 
@@ -92,125 +164,281 @@ class TextBox(LayeredComponent):
         self.lines = []
         self._num_active_lines = 1
 
+        # Cached advances for the current font, and the measured text of each line
+        self._measure = None
+        self._line_measures = dict()
+
+        # Wrapped lines as (start, end) spans of the text, and the rows that need to be placed again
+        self._spans = None
+        self._line_starts = []
+        self._line_ends = []
+        self._wrap_key = None
+        self._dirty_rows = set()
+
+        # The text the spans were wrapped from, which `text` may since have been assigned past
+        self._wrapped = None
+
     def load_style(self):
         self.font = self.style_get('font')
-        self.font.size = self.options_get('font-size')
-        self.line_height = self.font.get_sized_height()
+        self.fontsize = self.options_get('font-size')
+        self._sized_font = self._app._fonts.get(self.font, self.fontsize)
+        self.line_height = self._sized_font.height
+        self._measure = self._sized_font.measure
         self.fgcolor = self.style_get('fg-color')
         self._bg_factory = self.style_get('background')
 
     def refresh_background(self):
-        self.background = self._bg_factory(self.size, self.margin)
-        self.set_text(self.text)
+        self.background = self._make_background(self._bg_factory, self.size, self.margin)
+        self.set_text(self._text_buffer)
+        if self._composite:
+            self._dirty_rows.update(range(len(self.lines)))
+            self.refresh_layout_flag = True
+            return
         for line in self.lines:
             line.font = self.font
+            line.fontsize = self.fontsize
             line.fgcolor = self.fgcolor
 
     def refresh_proportions(self):
         super().refresh_proportions()
-        self.unregister(*self.lines)
-        self.lines = [Text('', parent_style=True) for _ in range((self.h - 2 * self.margin) // self.line_height)]
-        self.register_load(*self.lines)
+        self._make_lines()
+        self._spans = None
+        self._line_measures.clear()
+        self.set_text(self._text_buffer)
 
     def refresh_layout(self):
-        self.set_text(self.text)
+        self.set_text(self._text_buffer)
+        for row in self._dirty_rows:
+            if row < len(self.lines):
+                self._place_line(row)
+        self._dirty_rows.clear()
+
+    @property
+    def _text_buffer(self):
+        # The text that lines are wrapped from, which only needs str-style find, indexing and slicing
+        return self.text
+
+    def _make_lines(self):
+        count = (self.h - 2 * self.margin) // self.line_height
+        if self._composite:
+            self.lines = [_TextLine() for _ in range(count)]
+            return
+        self.unregister(*self.lines)
+        self.lines = [Text('', parent_style=True) for _ in range(count)]
+        self.register_load(*self.lines)
 
     @double_buffer
     class justify:
         def on_transition(self):
-            y = self.margin
-            for line in self.lines:
-                if self.justify == 'left':
-                    line.left = self.margin
-                elif self.justify == 'center':
-                    line.midx = self.relmidx
-                else:
-                    line.right = self.relright - self.margin
-                line.y = y
-                y += self.line_height
+            for row in range(len(self.lines)):
+                self._place_line(row)
 
-    def _wrap_paragraph(self, text):
-        if text == '':
-            return ['']
-
-        w = self.w - 2 * self.margin
+    def _place_line(self, row):
+        line = self.lines[row]
+        if self._composite:
+            # Composited lines are redrawn both where they were and where they end up
+            self._add_line_rect(line)
+            # With the colorkey of a (translucent) Text, so that lines blit the same way and share its surfaces
+            line.surface = _render(self._app, self._sized_font, self.fgcolor, line.text, colorkey=(0, 0, 0, 0))
+            line.size = line.surface.get_size()
+        if self.justify == 'left':
+            line.left = self.margin
+        elif self.justify == 'center':
+            line.midx = self.relmidx
+        else:
+            line.right = self.relright - self.margin
+        line.y = self._row_height(row)
+        if self._composite:
+            self._add_line_rect(line)
+
+    def _add_line_rect(self, line):
+        if line.w > 0 and line.h > 0:
+            self._add_dirty_rect(Rect.copy(line))
+
+    def _redraw_background(self, rect):
+        super()._redraw_background(rect)
+        if not self._composite:
+            return
+        first = max((rect.y - self.margin) // self.line_height, 0)
+        stop = min((rect.bottom - self.margin) // self.line_height + 1, self._num_active_lines)
+        flags = BLEND_PREMULTIPLIED if self._is_premultiplied else 0
+        self._display.set_clip(rect.as_pygame_rect())
+        for line in self.lines[first:stop]:
+            if line.surface is not None and line.collide_rect(rect):
+                self._display.blit(line.surface, line.pos, None, flags)
+        self._display.set_clip(None)
+
+    def _wrap_paragraph(self, text, start, end, w):
+        # Yield the span of each line of the paragraph `text[:end]`, starting from the line that begins at `start`
+        line_start = start
+        line_pen = 0
+        word_start = start
+        while word_start < end:
+            # Each word keeps its trailing space, and the line so far is `text[line_start:word_start]`
+            word_end = text.find(' ', word_start, end) + 1 or end
+            word = self._measure.measure(text[word_start:word_end])
+            if line_start == word_start:
+                kerning = 0
+                line_w = word.width()
+            else:
+                kerning = self._measure.kerning(text[word_start - 1], word.text[0])
+                line_w = math.ceil(line_pen + kerning + word.ends[-1] + self._measure.overhang(word.text[-1]))
 
-        words = text.split(' ')
-        lines = []
-        line = ''
-        for i, word in enumerate(words):
-            if i != len(words) - 1:
-                word = word + ' '
             # If the unit won't fit on the current line
-            if self.font.get_rect(line + word).w > w:
-                if self.font.get_rect(word).w <= w:
-                    lines.append(line)
-                    line = word
+            if line_w > w:
+                if word.width() <= w:
+                    yield self._trim_span(text, line_start, word_start)
+                    line_start = word_start
+                    line_pen = word.ends[-1]
                 # If the unit won't even fit alone on a line, it must be split
                 else:
-                    if line:
-                        lines.append(line)
-                    while self.font.get_rect(word).w > w:
-                        lo = 0
-                        hi = len(word)
-                        while lo < hi:
-                            mid = (lo + hi) // 2
-                            if w < self.font.get_rect(word[:mid]).w:
-                                hi = mid
-                            else:
-                                lo = mid + 1
-                        lines.append(word[:lo - 1])
-                        word = word[lo - 1:]
-                    line = word
+                    if line_start < word_start:
+                        yield self._trim_span(text, line_start, word_start)
+                    split = 0
+                    while word.width(split) > w:
+                        next_split = max(word.fit(split, w), split + 1)
+                        yield self._trim_span(text, word_start + split, word_start + next_split)
+                        split = next_split
+                    line_start = word_start + split
+                    line_pen = word.ends[-1] - word.starts[split]
             else:
-                line += word
+                line_pen += kerning + word.ends[-1]
+            word_start = word_end
 
-        # Trim a single trailing space from each word wrapped line
-        for i, l in enumerate(lines):
-            if l[-1] == ' ':
-                lines[i] = l[:-1]
+        # The last line keeps its trailing space
+        yield line_start, end
 
-        # Append last line
-        if line:
-            lines.append(line)
+    @staticmethod
+    def _trim_span(text, start, end):
+        # Trim a single trailing space from each word wrapped line
+        if text[end - 1] == ' ':
+            return start, end - 1
+        return start, end
 
-        return lines
+    def _wrap_from(self, text, start):
+        # Yield the span of each wrapped line, starting from the line that begins at `start`
+        w = self.w - 2 * self.margin
+        while True:
+            end = text.find('\r', start)
+            if end == -1:
+                end = len(text)
+            if start == end:
+                yield start, end
+            else:
+                yield from self._wrap_paragraph(text, start, end, w)
+            if end == len(text):
+                return
+            start = end + 1
 
     def _wrap(self, text):
-        # Handle newlines recursively
-        return [line for paragraph in text.split('\r') for line in self._wrap_paragraph(paragraph)]
+        return [text[start:end] for start, end in self._wrap_from(text, 0)]
+
+    def _rewrap(self, text, edit=None):
+        # Returns the new line spans, and the range of rows that were wrapped again
+        key = self.w - 2 * self.margin, self._measure
+        if self._spans is None or key != self._wrap_key:
+            spans = list(self._wrap_from(text, 0))
+            return spans, 0, len(spans)
+
+        # Only `old[prefix:old_len - suffix]` was replaced
+        if edit is None:
+            if text is self._wrapped:
+                return self._spans, 0, 0
+            old = str(self._wrapped)
+            if text == old:
+                return self._spans, 0, 0
+            old_len = len(old)
+            prefix = _common_prefix(old, text)
+            suffix = _common_suffix(old, text, min(old_len, len(text)) - prefix)
+        else:
+            prefix, old_end, new_end = edit
+            old_len = len(text) - new_end + old_end
+            suffix = old_len - old_end
+        shift = len(text) - old_len
+
+        # The line before the edit may be able to absorb the start of the edited line
+        first = max(bisect.bisect_right(self._line_starts, prefix) - 2, 0)
+        spans = self._spans[:first]
+        for start, end in self._wrap_from(text, self._line_starts[first]):
+            # Once a line starts at an old line start past the edit, the rest of the old wrapping still holds
+            old_start = start - shift
+            if old_start >= old_len - suffix:
+                row = bisect.bisect_left(self._line_starts, old_start)
+                if row < len(self._line_starts) and self._line_starts[row] == old_start:
+                    stop = len(spans)
+                    spans.extend((s + shift, e + shift) for s, e in self._spans[row:])
+                    return spans, first, stop
+            spans.append((start, end))
+        return spans, first, len(spans)
 
     def set_text(self, text):
-        lines = self._wrap(text)
-        if len(lines) > len(self.lines):
+        return self._set_text(text)
+
+    def _set_text(self, text, edit=None):
+        # `edit` is an optional (start, old end, new end) hint for the only region of the text that changed
+        spans, first, stop = self._rewrap(text, edit)
+        if len(spans) > len(self.lines):
             return False
-        self._num_active_lines = len(lines)
-        for old_line, new_line_text in zip(self.lines, lines):
-            old_line.text = new_line_text
-        for old_line in self.lines[len(lines):]:
-            old_line.text = ''
-        self.text = text
+
+        # Rows after the rewrapped ones only change if the number of lines changed
+        if len(spans) != self._num_active_lines:
+            stop = max(len(spans), self._num_active_lines)
+        for row in range(first, stop):
+            line = self.lines[row]
+            if row < len(spans):
+                start, end = spans[row]
+                line_text = text[start:end]
+            else:
+                line_text = ''
+            if line.text != line_text:
+                line.text = line_text
+                self._dirty_rows.add(row)
+
+        if self._dirty_rows:
+            self.refresh_layout_flag = True
+        self._store_wrap(text, spans)
         return True
 
+    def _store_wrap(self, text, spans):
+        self._num_active_lines = len(spans)
+        self._spans = spans
+        self._line_starts = [start for start, _ in spans]
+        self._line_ends = [end for _, end in spans]
+        self._wrap_key = self.w - 2 * self.margin, self._measure
+        self._wrapped = text
+        self.text = text
+
     def _row_height(self, row):
         return self.margin + row * self.line_height
 
+    def _row_text(self, row):
+        return self.lines[row].text
+
+    def _measure_line(self, row):
+        text = self._row_text(row)
+        measured = self._line_measures.get(row)
+        if measured is None or measured.measure is not self._measure or measured.text != text:
+            measured = self._line_measures[row] = self._measure.measure(text)
+        return measured
+
     def _grid_pos(self, row, col):
-        line = self.lines[row]
+        line = self._measure_line(row)
 
         if col < len(line.text) and not line.text[col].isspace():
-            off = self.font.get_rect(line.text[:col + 1]).w - self.font.get_metrics(line.text[col])[0][4]
+            off = line.width(0, col + 1) - self._measure.advance(line.text[col])
         else:
-            off = self.font.get_rect(line.text[:col]).w
+            off = line.width(0, col)
 
         if self.justify == 'left':
             return self.margin + off, self._row_height(row)
         elif self.justify == 'right':
-            line_w = self.font.get_rect(line.text).w
-            return off + self.w - self.margin - line_w, self._row_height(row)
+            return off + self.w - self.margin - line.width(), self._row_height(row)
         elif self.justify == 'center':
-            line_w = self.font.get_rect(line.text).w
-            return self.w / 2 - line_w / 2 + off, self._row_height(row)
+            return self.w / 2 - line.width() / 2 + off, self._row_height(row)
 
     def _grid_index(self, row, col):
-        return sum(len(line.text) + 1 for line in self.lines[:row]) + col
+        return self._line_starts[row] + col
+
+    def _grid_row(self, index):
+        # The first row that ends at or after `index`
+        return min(bisect.bisect_left(self._line_ends, index), self._num_active_lines - 1)
@@ -21,61 +21,75 @@ from .text import TextBox
 from .component import FlatComponent
 
 from ..timing import Pulse
-from ..util import Time, keyboard
+from ..util import EditHistory, Rope, Time, keyboard
 
 import pygame
-import pyperclip
 
 import functools
 
 
-def _backwards_word(s, index):
-    start = index - 1
-    while start >= 0 and not s[start].isalnum():
-        start -= 1
-    while start >= 0 and s[start].isalnum():
-        start -= 1
-    return start + 1
+def _backwards_word(buffer, index):
+    in_word = False
+    for char in buffer.chars(index, reverse=True):
+        if char.isalnum():
+            in_word = True
+        elif in_word:
+            break
+        index -= 1
+    return index
 
 
-def _forwards_word(s, index):
-    end = index
-    while end < len(s) and not s[end].isalnum():
-        end += 1
-    while end < len(s) and s[end].isalnum():
-        end += 1
-    return end
+def _forwards_word(buffer, index):
+    in_word = False
+    for char in buffer.chars(index):
+        if char.isalnum():
+            in_word = True
+        elif in_word:
+            break
+        index += 1
+    return index
 
 
-def _edit(text, index, unicode, key, mod):
+# Edits return the new cursor index, and the span of the buffer to replace with the returned text
+def _edit(buffer, index, unicode, key, mod):
     if key == pygame.K_BACKSPACE:
         if index == 0:
-            return index, text
+            return index, index, index, ''
         if mod & pygame.KMOD_CTRL:
-            start = _backwards_word(text, index)
-            return start, text[:start] + text[index:]
-        return index - 1, text[:index - 1] + text[index:]
+            start = _backwards_word(buffer, index)
+            return start, start, index, ''
+        return index - 1, index - 1, index, ''
     if key == pygame.K_DELETE:
-        if index == len(text):
-            return index, text
+        if index == len(buffer):
+            return index, index, index, ''
         if mod & pygame.KMOD_CTRL:
-            end = _forwards_word(text, index)
-            return index, text[:index] + text[end:]
-        return index, text[:index] + text[index + 1:]
+            return index, index, _forwards_word(buffer, index), ''
+        return index, index, index + 1, ''
 
     if unicode == '\t':
         unicode = '    '
-    return index + len(unicode), text[:index] + unicode + text[index:]
+    return index + len(unicode), index, index, unicode
 
 
-def _edit_region(text, start, end, unicode, key, mod):
+def _edit_region(start, end, unicode, key, mod):
     if key == pygame.K_BACKSPACE or key == pygame.K_DELETE:
-        return start, text[:start] + text[end:]
+        return start, start, end, ''
 
     if unicode == '\t':
         unicode = '    '
 
-    return start + len(unicode), text[:start] + unicode + text[end:]
+    return start + len(unicode), start, end, unicode
+
+
+def _edit_kind(key, mod):
+    # Single character edits without a highlight are merged into one undo step
+    if mod & pygame.KMOD_CTRL:
+        return None
+    if key == pygame.K_BACKSPACE:
+        return EditHistory.BACKSPACE
+    if key == pygame.K_DELETE:
+        return EditHistory.DELETE
+    return EditHistory.INSERT
 
 
 class Cursor(FlatComponent):
@@ -102,7 +116,7 @@ class Cursor(FlatComponent):
     def refresh_background(self):
         self.w = max(self.parent.line_height // 10, 1)
         self.h = self.parent.line_height
-        self.background = self._bg_factory(self.size)
+        self.background = self._make_background(self._bg_factory, self.size)
 
     def on_activate(self):
         self.blinker.start()
@@ -208,14 +222,18 @@ class CursorPlacement:
     __str__ = __repr__
 
 
-# TODO: Undo
 # TODO: Double click to highlight word, triple to highlight line
 class TextEntryBox(Widget, TextBox):
     MSG_UNDO = 'text-undo'
+    MSG_REDO = 'text-redo'
     MSG_HIGHLIGHT_ALL = 'text-highlight-all'
     MSG_CUT = 'text-cut'
     MSG_COPY = 'text-copy'
     MSG_PASTE = 'text-paste'
+    MSG_PASTE_READY = 'text-paste-ready'
+
+    _buffer = None
+    _history = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -227,6 +245,84 @@ class TextEntryBox(Widget, TextBox):
         self.highlight = None
         self._hl_cursor_place = None
 
+        # Undo & redo
+        self._history = EditHistory()
+
+    @property
+    def text(self):
+        return str(self._buffer)
+
+    @text.setter
+    def text(self, other):
+        # Edits are wrapped straight from the buffer, so storing it again needs no comparison
+        if other is self._buffer:
+            return
+        if self._buffer is None or other != str(self._buffer):
+            self._buffer = Rope(other)
+            if self._history is not None:
+                self._history.clear()
+                self._reset_text()
+
+    def _reset_text(self):
+        # The wrapped lines and cursors index into the replaced text, so wrap it all again and clamp the cursors to it
+        self._spans = None
+        wrapped = self._measure is not None and self._set_text(self._buffer)
+        for place in self._cursor_place, self._hl_cursor_place:
+            if place is not None:
+                index = min(place.index, len(self._buffer))
+                if wrapped:
+                    self._place_cursor_by_index(place, index)
+                else:
+                    place.index = index
+        if self._hl_cursor_place == self._cursor_place:
+            self._hl_cursor_place = None
+
+    @property
+    def _text_buffer(self):
+        return self._buffer
+
+    def _replace(self, start, end, replacement):
+        # Returns the replaced text, or None if the result doesn't fit
+        removed = self._buffer[start:end]
+        self._buffer.replace(start, end, replacement)
+        if self._set_text(self._buffer, (start, end, start + len(replacement))):
+            return removed
+        self._buffer.replace(start, start + len(replacement), removed)
+        return None
+
+    def _edit_state(self):
+        hl_index = None if self._hl_cursor_place is None else self._hl_cursor_place.index
+        return self._cursor_place.index, hl_index
+
+    def _restore_state(self, state):
+        index, hl_index = state
+        self._place_cursor_by_index(self._cursor_place, index)
+        if hl_index is None:
+            self._hl_cursor_place = None
+        else:
+            self._hl_cursor_place = CursorPlacement()
+            self._place_cursor_by_index(self._hl_cursor_place, hl_index)
+
+    def _undo(self):
+        edit = self._history.undo()
+        if edit is None:
+            return
+        if self._replace(edit.start, edit.start + len(edit.inserted), edit.removed) is None:
+            self._history.redo()
+        else:
+            self._restore_state(edit.before)
+        self.cursor.start()
+
+    def _redo(self):
+        edit = self._history.redo()
+        if edit is None:
+            return
+        if self._replace(edit.start, edit.start + len(edit.removed), edit.inserted) is None:
+            self._history.undo()
+        else:
+            self._restore_state(edit.after)
+        self.cursor.start()
+
     def on_load(self):
         super().on_load()
         self.cursor = Cursor(z=10, active=False)
@@ -235,6 +331,10 @@ class TextEntryBox(Widget, TextBox):
         self.highlight = Highlight(z=-10, active=False)
         self.register_load(self.highlight)
 
+    def load_options(self):
+        super().load_options()
+        self._history.limit = self.options_get('undo-memory', EditHistory.MEMORY_LIMIT)
+
     def refresh_proportions(self):
         super().refresh_proportions()
         self.highlight.w = self.w - 2 * self.margin
@@ -260,6 +360,7 @@ class TextEntryBox(Widget, TextBox):
             self._hl_cursor_place = self._cursor_place.copy()
 
         self._place_cursor_by_pos(self._cursor_place, pos)
+        self._history.separate()
 
         # Shift-clicked where the cursor already is
         if self._hl_cursor_place is not None and self._hl_cursor_place == self._cursor_place:
@@ -280,6 +381,7 @@ class TextEntryBox(Widget, TextBox):
     def _handle_key(self, unicode, key, mod):
         prev_index = self._cursor_place.index
         if key in keyboard.navigation_keys:
+            self._history.separate()
             if self._hl_cursor_place is not None and not mod & pygame.KMOD_SHIFT:
                 self._navigate_region(key, mod)
                 self._hl_cursor_place = None
@@ -297,16 +399,37 @@ class TextEntryBox(Widget, TextBox):
             except AttributeError:
                 pass
         elif key in keyboard.editing_keys:
+            before = self._edit_state()
             if self._hl_cursor_place is None:
-                index, text = _edit(self.text, self._cursor_place.index, unicode, key, mod)
+                index, start, end, replacement = _edit(self._buffer, self._cursor_place.index, unicode, key, mod)
+                kind = _edit_kind(key, mod)
             else:
                 start = min(self._hl_cursor_place.index, self._cursor_place.index)
                 end = max(self._hl_cursor_place.index, self._cursor_place.index)
-                index, text = _edit_region(self.text, start, end, unicode, key, mod)
+                index, start, end, replacement = _edit_region(start, end, unicode, key, mod)
+                kind = None
                 self._hl_cursor_place = None
-            if self.set_text(text):
-                if index != self._cursor_place.index:
-                    self._place_cursor_by_index(self._cursor_place, index)
+            self._apply_edit(index, start, end, replacement, before, kind)
+        self.cursor.start()
+
+    def _apply_edit(self, index, start, end, replacement, before, kind=None):
+        removed = self._replace(start, end, replacement)
+        if removed is not None:
+            if index != self._cursor_place.index:
+                self._place_cursor_by_index(self._cursor_place, index)
+            self._history.record(start, removed, replacement, before, self._edit_state(), kind)
+
+    def _paste(self, text):
+        # Other programs separate lines with '\n' or '\r\n'
+        text = text.replace('\r\n', '\r').replace('\n', '\r').replace('\t', '    ')
+        before = self._edit_state()
+        if self._hl_cursor_place is None:
+            start = end = self._cursor_place.index
+        else:
+            start = min(self._hl_cursor_place.index, self._cursor_place.index)
+            end = max(self._hl_cursor_place.index, self._cursor_place.index)
+            self._hl_cursor_place = None
+        self._apply_edit(start + len(text), start, end, text, before)
         self.cursor.start()
 
     def on_key_down(self, unicode, key, mod):
@@ -315,7 +438,9 @@ class TextEntryBox(Widget, TextBox):
 
     def handle_message(self, sender, message, **params):
         if message == TextEntryBox.MSG_UNDO:
-            pass  # TODO: Undo
+            self._undo()
+        elif message == TextEntryBox.MSG_REDO:
+            self._redo()
         elif message == TextEntryBox.MSG_CUT:
             self.handle_message(sender, TextEntryBox.MSG_COPY, **params)
             self._handle_key(None, pygame.K_DELETE, 0)
@@ -324,13 +449,17 @@ class TextEntryBox(Widget, TextBox):
                 left, right = self._hl_cursor_place, self._cursor_place
                 if left > right:
                     left, right = right, left
-                pyperclip.copy(self.text[left.index:right.index])
+                self._app._clipboard.copy(self._buffer[left.index:right.index].replace('\r', '\n'))
         elif message == TextEntryBox.MSG_PASTE:
-            self._handle_key(pyperclip.paste(), None, 0)
+            # The clipboard is read off the main thread, and the text arrives in a later frame
+            self._app._clipboard.paste(lambda text: self.handle_message(self, TextEntryBox.MSG_PASTE_READY, text=text),
+                                       self)
+        elif message == TextEntryBox.MSG_PASTE_READY:
+            self._paste(params['text'])
         elif message == TextEntryBox.MSG_HIGHLIGHT_ALL:
             self._hl_cursor_place = CursorPlacement()
             self._place_cursor_by_index(self._hl_cursor_place, 0)
-            self._place_cursor_by_index(self._cursor_place, len(self.text))
+            self._place_cursor_by_index(self._cursor_place, len(self._buffer))
         else:
             super().handle_message(sender, message, **params)
 
@@ -346,13 +475,13 @@ class TextEntryBox(Widget, TextBox):
 
         elif key == pygame.K_LEFT:
             if mod & pygame.KMOD_CTRL:
-                self._place_cursor_by_index(cursor, _backwards_word(self.text, cursor.index))
+                self._place_cursor_by_index(cursor, _backwards_word(self._buffer, cursor.index))
             elif cursor.index > 0:
                 self._place_cursor_by_index(cursor, cursor.index - 1)
         elif key == pygame.K_RIGHT:
             if mod & pygame.KMOD_CTRL:
-                self._place_cursor_by_index(cursor, _forwards_word(self.text, cursor.index))
-            elif cursor.index < len(self.text):
+                self._place_cursor_by_index(cursor, _forwards_word(self._buffer, cursor.index))
+            elif cursor.index < len(self._buffer):
                 self._place_cursor_by_index(cursor, cursor.index + 1)
 
         elif key == pygame.K_HOME:
@@ -362,7 +491,7 @@ class TextEntryBox(Widget, TextBox):
                 self._place_cursor_by_index(cursor, cursor.index - cursor.col)
         elif key == pygame.K_END:
             if mod & pygame.KMOD_CTRL:
-                self._place_cursor_by_index(cursor, len(self.text))
+                self._place_cursor_by_index(cursor, len(self._buffer))
             else:
                 self._place_cursor_by_index(cursor, cursor.index + len(self.lines[cursor.row].text) - cursor.col)
 
@@ -388,7 +517,7 @@ class TextEntryBox(Widget, TextBox):
                 self._place_cursor_by_index(cursor, cursor.index - cursor.col)
         elif key == pygame.K_END:
             if mod & pygame.KMOD_CTRL:
-                self._place_cursor_by_index(cursor, len(self.text))
+                self._place_cursor_by_index(cursor, len(self._buffer))
             else:
                 self._place_cursor_by_index(cursor, cursor.index + len(self.lines[cursor.row].text) - cursor.col)
 
@@ -406,8 +535,8 @@ class TextEntryBox(Widget, TextBox):
         hi = len(self.lines[cursor.row].text)
         while col < hi:
             mid = (col + hi) // 2
-            metrics = self.font.get_metrics(self.lines[cursor.row].text[mid])[0]
-            pivot = self._grid_pos(cursor.row, mid)[0] + (metrics[0] + metrics[1]) // 2
+            min_x, max_x, _ = self._measure.metrics(self.lines[cursor.row].text[mid])
+            pivot = self._grid_pos(cursor.row, mid)[0] + (min_x + max_x) // 2
             if cursor.raw_x > pivot:
                 col = mid + 1
             else:
@@ -420,18 +549,8 @@ class TextEntryBox(Widget, TextBox):
     def _place_cursor_by_index(self, cursor, index):
         # Index is given
         cursor.index = index
-
-        length = 0
-        for row, line in enumerate(self.lines[:self._num_active_lines]):
-            length += len(line.text)
-            if length >= index:
-                length -= len(line.text)
-                cursor.row = row
-                break
-            length += (row < self._num_active_lines - 1 and self.text[length].isspace())
-        else:
-            cursor.row = self._num_active_lines - 1
-        cursor.col = index - length
+        cursor.row = self._grid_row(index)
+        cursor.col = index - self._grid_index(cursor.row, 0)
 
         cursor.raw_x, cursor.raw_y = cursor.pos = self._grid_pos(cursor.row, cursor.col)
 
@@ -42,9 +42,14 @@ class Window(LayeredComponent):
     def load_options(self):
         self.title = self.options_get('title')
 
-    def refresh_proportions(self):
-        super().refresh_proportions()
-        self._display = pygame.display.set_mode(self.size, *self.args)
+    def _replace_display(self, flags=0):
+        # The display surface belongs to pygame, so it never comes from or goes back to the surface pool
+        return pygame.display.set_mode(self.size, *self.args)
+
+    def _apply_colorkey(self, surface):
+        # Nothing blits from the screen, so it is left without a colorkey
+        if surface is not self._display:
+            super()._apply_colorkey(surface)
 
     def refresh_background(self):
         super().refresh_background()
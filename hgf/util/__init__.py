@@ -20,6 +20,16 @@ from . import keyboard
 
 from .timer import Time, Timer, CountdownTimer
 from .rect import Rect
+from .atlas import TextureAtlas
+from .cache import LRUCache
+from .font import SizedFont, FontManager, FontMeasure, GlyphAtlas
+from .rope import Rope
+from .history import Edit, EditHistory
+from .clipboard import Clipboard
+from .pool import SurfacePool
+from .alpha import premultiply, premultiplied, is_premultiplied, mark_premultiplied, premultiply_color
+from .blit import blits
+from .geometry import GeometryStore
 
 
 __all__ = [
@@ -27,4 +37,14 @@ __all__ = [
     
     'Time', 'Timer', 'CountdownTimer',
     'Rect',
+    'TextureAtlas',
+    'LRUCache',
+    'SizedFont', 'FontManager', 'FontMeasure', 'GlyphAtlas',
+    'Rope',
+    'Edit', 'EditHistory',
+    'Clipboard',
+    'SurfacePool',
+    'premultiply', 'premultiplied', 'is_premultiplied', 'mark_premultiplied', 'premultiply_color',
+    'blits',
+    'GeometryStore',
 ]
@@ -0,0 +1,80 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+import pygame
+
+import weakref
+
+
+# Only available from Pygame 1.9.2
+BLEND_PREMULTIPLIED = getattr(pygame, 'BLEND_PREMULTIPLIED', None)
+
+# Surfaces made by `premultiply`, so that they are never multiplied twice
+_premultiplied = weakref.WeakSet()
+
+# Premultiplied views of surfaces that share their pixels with others, such as atlas regions
+_views = weakref.WeakKeyDictionary()
+
+
+def premultiply(surface):
+    # A copy of the surface with its colour channels multiplied by its alpha
+    w, h = surface.get_size()
+    if w == 0 or h == 0:
+        # Pygame crashes premultiplying empty surfaces, such as renders of empty strings
+        result = surface.copy()
+    elif hasattr(surface, 'premul_alpha'):
+        result = surface.premul_alpha()
+    else:
+        # Blending onto opaque black multiplies the colours, then the alpha channel is multiplied back in
+        result = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+        result.fill((0, 0, 0, 255))
+        result.blit(surface, (0, 0))
+        mask = surface.copy()
+        mask.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        result.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+    _premultiplied.add(result)
+    return result
+
+
+def premultiplied(surface):
+    if surface in _premultiplied:
+        return surface
+    try:
+        return _views[surface]
+    except KeyError:
+        return premultiply(surface)
+
+
+def mark_premultiplied(surface, original=None):
+    # For surfaces premultiplied by other means, such as subsurfaces of a premultiplied page
+    _premultiplied.add(surface)
+    if original is not None:
+        _views[original] = surface
+    return surface
+
+
+def is_premultiplied(surface):
+    return surface in _premultiplied
+
+
+def premultiply_color(color):
+    if len(color) < 4:
+        return tuple(color)
+    r, g, b, a = color
+    return r * a // 255, g * a // 255, b * a // 255, a
@@ -0,0 +1,181 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+from .alpha import mark_premultiplied, premultiply
+
+import pygame
+
+
+class _AtlasPage:
+    def __init__(self, size, kind):
+        flags, colorkey, alpha = self.kind = kind
+        self.surface = pygame.Surface(size, flags)
+        if flags & pygame.SRCALPHA:
+            self.surface.fill((0, 0, 0, 0))
+        else:
+            self.surface.fill((0, 0, 0) if colorkey is None else colorkey)
+            self.surface.set_colorkey(colorkey)
+            self.surface.set_alpha(alpha)
+        self.w, self.h = size
+
+        # Premultiplied copy of the surface, made on demand and dropped when more is packed
+        self.premultiplied = None
+
+        # The skyline is a list of [x, y, w] segments covering the page from left to right
+        self.skyline = [[0, 0, self.w]]
+
+    def _fit(self, index, w, h):
+        x = self.skyline[index][0]
+        if x + w > self.w:
+            return None
+        y = 0
+        remaining = w
+        while remaining > 0:
+            seg_x, seg_y, seg_w = self.skyline[index]
+            y = max(y, seg_y)
+            if y + h > self.h:
+                return None
+            remaining -= seg_w
+            index += 1
+        return y
+
+    def find(self, w, h):
+        best = None
+        for i, (x, _, _) in enumerate(self.skyline):
+            y = self._fit(i, w, h)
+            if y is not None and (best is None or (y + h, x) < (best[1] + h, best[0])):
+                best = x, y, i
+        return best
+
+    def place(self, x, y, index, w, h):
+        self.skyline.insert(index, [x, y + h, w])
+
+        # Shrink or remove the segments now hidden below the new one
+        i = index + 1
+        while i < len(self.skyline):
+            seg = self.skyline[i]
+            overlap = x + w - seg[0]
+            if overlap <= 0:
+                break
+            if overlap < seg[2]:
+                seg[0] += overlap
+                seg[2] -= overlap
+                break
+            del self.skyline[i]
+
+        # Merge neighbouring segments of the same height
+        i = 0
+        while i < len(self.skyline) - 1:
+            if self.skyline[i][1] == self.skyline[i + 1][1]:
+                self.skyline[i][2] += self.skyline[i + 1][2]
+                del self.skyline[i + 1]
+            else:
+                i += 1
+
+
+class TextureAtlas:
+    def __init__(self, size=(1024, 1024), padding=1, max_image_size=None):
+        self.size = tuple(size)
+        self.padding = padding
+        self.max_image_size = self.size if max_image_size is None else tuple(max_image_size)
+
+        self.pages = []
+        self.regions = dict()
+
+    def can_pack(self, image):
+        w, h = image.get_size()
+        max_w, max_h = self.max_image_size
+        pad = 2 * self.padding
+        return w <= max_w and h <= max_h and w + pad <= self.size[0] and h + pad <= self.size[1]
+
+    def pack(self, name, image):
+        if not self.can_pack(image):
+            return None
+
+        # Images only share a page with images that blit the same way, so opaque images don't gain per-pixel alpha
+        kind = _kind(image)
+        w, h = image.get_size()
+        pad_w, pad_h = w + 2 * self.padding, h + 2 * self.padding
+        for page in self.pages:
+            if page.kind != kind:
+                continue
+            spot = page.find(pad_w, pad_h)
+            if spot is not None:
+                break
+        else:
+            page = _AtlasPage(self.size, kind)
+            self.pages.append(page)
+            spot = page.find(pad_w, pad_h)
+
+        x, y, index = spot
+        page.place(x, y, index, pad_w, pad_h)
+        rect = pygame.Rect(x + self.padding, y + self.padding, w, h)
+        # Opaque images are copied as is, and their colorkey and alpha go to the region instead
+        page.surface.blit(_unkeyed(image), rect.topleft)
+        page.premultiplied = None
+
+        # A subsurface shares the page's pixels, so no copy is made for the handle
+        region = page.surface.subsurface(rect)
+        if not kind[0]:
+            region.set_colorkey(kind[1])
+            region.set_alpha(kind[2])
+        self.regions[name] = region
+        return region
+
+    def premultiply(self):
+        # Each page is premultiplied once, and its regions map to views of the copy rather than copies of their own
+        pages = {page.surface: page for page in self.pages
+                 if page.premultiplied is None and page.kind[0] & pygame.SRCALPHA}
+        for page in pages.values():
+            page.premultiplied = premultiply(page.surface)
+        for region in self.regions.values():
+            page = pages.get(region.get_parent())
+            if page is not None:
+                view = page.premultiplied.subsurface(pygame.Rect(region.get_offset(), region.get_size()))
+                mark_premultiplied(view, region)
+
+    def pack_all(self, images):
+        # Tallest first keeps the skyline flat
+        order = sorted(images.items(), key=lambda item: item[1].get_height(), reverse=True)
+        return {name: region for name, region in ((name, self.pack(name, image)) for name, image in order)
+                if region is not None}
+
+    def __contains__(self, name):
+        return name in self.regions
+
+    def __str__(self):
+        return '{}({} images, {} pages of {}x{})'.format(self.__class__.__name__, len(self.regions),
+                                                         len(self.pages), *self.size)
+
+    __repr__ = __str__
+
+
+def _kind(image):
+    if image.get_flags() & pygame.SRCALPHA:
+        return pygame.SRCALPHA, None, None
+    return 0, image.get_colorkey(), image.get_alpha()
+
+
+def _unkeyed(image):
+    if image.get_flags() & pygame.SRCALPHA or image.get_colorkey() is None and image.get_alpha() is None:
+        return image
+    image = image.copy()
+    image.set_colorkey(None)
+    image.set_alpha(None)
+    return image
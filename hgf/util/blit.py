@@ -0,0 +1,33 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+import pygame
+
+
+# Only available from Pygame 1.9.4
+_HAS_BLITS = hasattr(pygame.Surface, 'blits')
+
+
+def blits(surface, sequence):
+    # Blit a sequence of (source, dest, area, flags), submitted in one call where Pygame allows
+    if _HAS_BLITS:
+        surface.blits(sequence, doreturn=False)
+    else:
+        for source, dest, area, flags in sequence:
+            surface.blit(source, dest, area, flags)
@@ -0,0 +1,99 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+from collections import OrderedDict
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+class LRUCache:
+    def __init__(self, budget, weigh=None):
+        self._budget = budget
+        self._weigh = (lambda value: 1) if weigh is None else weigh
+        self._entries = OrderedDict()
+        self.weight = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @budget.setter
+    def budget(self, other):
+        self._budget = other
+        self._evict()
+
+    def get(self, key, factory):
+        try:
+            value, _ = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = factory()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.discard(key)
+        weight = self._weigh(value)
+        if weight > self._budget:
+            return
+        self._entries[key] = value, weight
+        self.weight += weight
+        self._evict()
+
+    def discard(self, key):
+        try:
+            _, weight = self._entries.pop(key)
+        except KeyError:
+            return
+        self.weight -= weight
+
+    def clear(self):
+        self._entries.clear()
+        self.weight = 0
+
+    def _evict(self):
+        while self.weight > self._budget:
+            _, (_, weight) = self._entries.popitem(last=False)
+            self.weight -= weight
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return '{}({} entries, {}/{}, {} hits, {} misses, {} evictions)'.format(
+            self.__class__.__name__, len(self), self.weight, self._budget, self.hits, self.misses, self.evictions)
+
+    __repr__ = __str__
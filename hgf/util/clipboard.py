@@ -0,0 +1,127 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+import pygame
+import pyperclip
+
+import logging
+import queue
+import threading
+
+
+class Clipboard:
+    def __init__(self):
+        # Requests run on a worker thread, and their results wait for the main thread to poll them
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._worker = None
+
+        # The last text copied from this app, in case the system clipboard is unavailable
+        self.last_copy = ''
+
+        # Whether pygame's clipboard is usable, or None if it hasn't been tried yet
+        self._has_scrap = None
+
+    def copy(self, text):
+        self.last_copy = text
+        if self._scrap_put(text):
+            return
+        self._submit(self._copy, text)
+
+    def paste(self, callback, owner=None):
+        # `callback` is called with the pasted text during a later `poll`, unless `owner` (a component) has been
+        # detached from its app by then
+        request = callback, owner, None if owner is None else owner._app
+        text = self._scrap_get()
+        if text is not None:
+            self._results.put((request, text))
+            return
+        self._submit(self._paste, callback=request)
+
+    def poll(self):
+        while True:
+            try:
+                (callback, owner, app), result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if owner is None or (app is not None and owner._app is app):
+                callback(result)
+
+    def _use_scrap(self):
+        # The scrap module needs a display, and must only be used from the main thread
+        if self._has_scrap is None and pygame.display.get_surface() is not None:
+            try:
+                if not pygame.scrap.get_init():
+                    pygame.scrap.init()
+                self._has_scrap = True
+            except (pygame.error, NotImplementedError):
+                self._has_scrap = False
+        return self._has_scrap
+
+    def _scrap_put(self, text):
+        if not self._use_scrap():
+            return False
+        try:
+            pygame.scrap.put(pygame.SCRAP_TEXT, text.encode('utf-8'))
+        except pygame.error:
+            self._has_scrap = False
+            return False
+        return True
+
+    def _scrap_get(self):
+        if not self._use_scrap():
+            return None
+        try:
+            data = pygame.scrap.get(pygame.SCRAP_TEXT)
+        except pygame.error:
+            self._has_scrap = False
+            return None
+        if data is None:
+            return None
+        return data.decode('utf-8', 'replace').rstrip('\0')
+
+    def _copy(self, text):
+        try:
+            pyperclip.copy(text)
+        except pyperclip.PyperclipException:
+            pass
+
+    def _paste(self):
+        try:
+            return pyperclip.paste()
+        except pyperclip.PyperclipException:
+            return self.last_copy
+
+    def _submit(self, func, *args, callback=None):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name='hgf-clipboard', daemon=True)
+            self._worker.start()
+        self._requests.put((func, args, callback))
+
+    def _work(self):
+        while True:
+            func, args, callback = self._requests.get()
+            try:
+                result = func(*args)
+            except Exception:
+                # The worker has to outlive any failure, or every later request would wait on it forever
+                logging.exception('Clipboard request failed')
+                result = None if callback is None else self.last_copy
+            if callback is not None:
+                self._results.put((callback, result))
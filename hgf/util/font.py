@@ -0,0 +1,307 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+from .alpha import BLEND_PREMULTIPLIED, mark_premultiplied, premultiply
+from .atlas import TextureAtlas
+from .blit import blits
+from .cache import LRUCache
+
+import pygame
+import pygame.freetype
+
+import math
+import weakref
+
+
+class SizedFont:
+    def __init__(self, face, size, style=pygame.freetype.STYLE_DEFAULT):
+        # The FreeType face is shared by every handle, and is never resized
+        self.face = face
+        self.size = size
+        self.style = style
+
+        self._height = None
+        self._ascender = None
+        self._descender = None
+        self._measure = None
+
+    @property
+    def height(self):
+        if self._height is None:
+            self._height = self.face.get_sized_height(self.size)
+        return self._height
+
+    @property
+    def ascender(self):
+        if self._ascender is None:
+            self._ascender = self.face.get_sized_ascender(self.size)
+        return self._ascender
+
+    @property
+    def descender(self):
+        if self._descender is None:
+            self._descender = self.face.get_sized_descender(self.size)
+        return self._descender
+
+    @property
+    def kerning(self):
+        return self.face.kerning
+
+    @property
+    def measure(self):
+        if self._measure is None:
+            self._measure = FontMeasure(self)
+        return self._measure
+
+    def render(self, text, fgcolor):
+        return self.face.render(text, fgcolor=fgcolor, style=self.style, size=self.size)
+
+    def get_rect(self, text):
+        return self.face.get_rect(text, style=self.style, size=self.size)
+
+    def get_metrics(self, text):
+        # Unlike render and get_rect, get_metrics has no style argument and uses the face's own style
+        if self.style == pygame.freetype.STYLE_DEFAULT:
+            return self.face.get_metrics(text, size=self.size)
+        style = self.face.style
+        self.face.style = self.style
+        try:
+            return self.face.get_metrics(text, size=self.size)
+        finally:
+            self.face.style = style
+
+    def __repr__(self):
+        return 'SizedFont({}, size={}, style={})'.format(self.face.name, self.size, self.style)
+
+    __str__ = __repr__
+
+
+class FontManager:
+    def __init__(self, budget):
+        # The budget only bounds the handles kept alive while unused, so a handle that is still held somewhere
+        # (e.g. by a text cache key or a TextBox) is never replaced by a second one for the same key
+        self._fonts = LRUCache(budget)
+        self._handles = weakref.WeakValueDictionary()
+
+    @property
+    def budget(self):
+        return self._fonts.budget
+
+    @budget.setter
+    def budget(self, other):
+        self._fonts.budget = other
+
+    def get(self, face, size, style=pygame.freetype.STYLE_DEFAULT):
+        # Handles are unique per key, so they can be used as keys for rendered and measured text
+        key = face, size, style
+        font = self._handles.get(key)
+        if font is None:
+            font = self._handles[key] = SizedFont(face, size, style)
+        return self._fonts.get(key, lambda: font)
+
+    def clear(self):
+        self._fonts.clear()
+
+    def __len__(self):
+        return len(self._fonts)
+
+    def __str__(self):
+        return '{}({})'.format(self.__class__.__name__, self._fonts)
+
+    __repr__ = __str__
+
+
+class FontMeasure:
+    def __init__(self, font):
+        self.font = font
+
+        self._metrics = dict()
+        self._kerning = dict()
+
+    def metrics(self, char):
+        # (min_x, max_x, advance) of a single glyph
+        try:
+            return self._metrics[char]
+        except KeyError:
+            pass
+        metrics = self.font.get_metrics(char)[0]
+        if metrics is None:
+            w = self.font.get_rect(char).w
+            result = 0, w, w
+        else:
+            result = metrics[0], metrics[1], metrics[4]
+        self._metrics[char] = result
+        return result
+
+    def advance(self, char):
+        return self.metrics(char)[2]
+
+    def overhang(self, char):
+        _, max_x, advance = self.metrics(char)
+        return max(0, max_x - advance)
+
+    def kerning(self, left, right):
+        if not self.font.kerning:
+            return 0
+        try:
+            return self._kerning[left, right]
+        except KeyError:
+            pass
+        predicted = math.ceil(self.advance(left) + self.advance(right) + self.overhang(right))
+        result = self._kerning[left, right] = self.font.get_rect(left + right).w - predicted
+        return result
+
+    def measure(self, text):
+        return MeasuredText(self, text)
+
+    def width(self, text):
+        return MeasuredText(self, text).width()
+
+
+class MeasuredText:
+    def __init__(self, measure, text):
+        self.measure = measure
+        self.text = text
+
+        # Pen position where each glyph starts (including kerning), and where its advance ends
+        self.starts = []
+        self.ends = []
+        x = 0
+        prev = None
+        for char in text:
+            if prev is not None:
+                x += measure.kerning(prev, char)
+            self.starts.append(x)
+            x += measure.advance(char)
+            self.ends.append(x)
+            prev = char
+
+    def __len__(self):
+        return len(self.text)
+
+    def width(self, start=0, end=None):
+        # Equivalent to `font.get_rect(text[start:end]).w`
+        if end is None:
+            end = len(self.text)
+        if end <= start:
+            return 0
+        return math.ceil(self.ends[end - 1] - self.starts[start] + self.measure.overhang(self.text[end - 1]))
+
+    def fit(self, start, w):
+        # Largest end such that `text[start:end]` is no wider than w
+        lo = start
+        hi = len(self.text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.width(start, mid) <= w:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+
+class _Glyph:
+    def __init__(self, surface, area, top, advance, overhang):
+        self.surface = surface
+        self.area = area
+        self.top = top
+        self.bottom = area.h - top
+        self.advance = advance
+        self.overhang = overhang
+
+
+class GlyphAtlas:
+    PAGE_SIZE = 256
+
+    def __init__(self, font, fgcolor, premultiplied=False):
+        self.font = font
+        self.fgcolor = fgcolor
+        self.measure = font.measure
+
+        # Glyphs are premultiplied once as they are packed, and so is everything rendered from them
+        self.premultiplied = premultiplied
+
+        self._atlas = TextureAtlas(size=(GlyphAtlas.PAGE_SIZE, GlyphAtlas.PAGE_SIZE), padding=1)
+        self._glyphs = dict()
+
+    def glyph(self, char):
+        try:
+            return self._glyphs[char]
+        except KeyError:
+            pass
+
+        surf, rect = self.font.render(char, self.fgcolor)
+        if self.premultiplied:
+            surf = premultiply(surf)
+        region = self._atlas.pack(char, surf)
+        advance, overhang = self.measure.advance(char), self.measure.overhang(char)
+        if region is None:
+            glyph = _Glyph(surf, surf.get_rect(), rect.y, advance, overhang)
+        else:
+            glyph = _Glyph(region.get_parent(), pygame.Rect(region.get_offset(), region.get_size()), rect.y,
+                           advance, overhang)
+        self._glyphs[char] = glyph
+        return glyph
+
+    def _layout(self, text):
+        # The glyphs of a non-empty string, the pen position of each, the baseline, and the size of the whole string.
+        # Equivalent to measuring the string with a MeasuredText, from metrics cached with the glyphs
+        known = self._glyphs
+        glyphs = [known[char] if char in known else self.glyph(char) for char in text]
+        positions = []
+        x = 0
+        if self.font.kerning:
+            kerning = self.measure.kerning
+            prev = text[0]
+            for char, glyph in zip(text, glyphs):
+                if positions:
+                    x += kerning(prev, char)
+                    prev = char
+                positions.append(x)
+                x += glyph.advance
+        else:
+            for glyph in glyphs:
+                positions.append(x)
+                x += glyph.advance
+        top = max([glyph.top for glyph in glyphs])
+        bottom = max([glyph.bottom for glyph in glyphs])
+        return glyphs, positions, top, (math.ceil(x + glyphs[-1].overhang), top + bottom)
+
+    def layout(self, text):
+        # Pen position of each glyph, the baseline, and the size of the whole string
+        if not text:
+            rect = self.font.get_rect('')
+            return [], rect.y, (0, rect.h)
+        return self._layout(text)[1:]
+
+    def get_rect(self, text):
+        _, top, size = self.layout(text)
+        return pygame.Rect((0, top), size)
+
+    def render(self, text):
+        if not text:
+            surf = self.font.render(text, self.fgcolor)[0]
+            return mark_premultiplied(surf) if self.premultiplied else surf
+        glyphs, positions, top, size = self._layout(text)
+        # New surfaces start out transparent, so there is nothing to clear
+        surf = pygame.Surface(size, pygame.SRCALPHA)
+        flags = BLEND_PREMULTIPLIED if self.premultiplied else 0
+        sequence = [(glyph.surface, (int(x), top - glyph.top), glyph.area, flags) for glyph, x in zip(glyphs, positions)]
+        blits(surf, sequence)
+        return mark_premultiplied(surf) if self.premultiplied else surf
@@ -0,0 +1,185 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class GeometryStore:
+    INITIAL_CAPACITY = 64
+
+    # Columns of the current and previous geometry
+    X, Y, W, H = range(4)
+
+    def __init__(self):
+        if numpy is None:
+            raise ImportError('GeometryStore requires numpy')
+        capacity = GeometryStore.INITIAL_CAPACITY
+        self._current = numpy.zeros((capacity, 4), dtype=numpy.int64)
+        self._previous = numpy.zeros((capacity, 4), dtype=numpy.int64)
+        self._absolute = numpy.zeros((capacity, 2), dtype=numpy.int64)
+        self._parents = numpy.full(capacity, -1, dtype=numpy.intp)
+        self._depths = numpy.zeros(capacity, dtype=numpy.intp)
+        self._live = numpy.zeros(capacity, dtype=bool)
+        self._components = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+
+        # Live ids at each depth, so that absolute offsets can be computed a level at a time
+        self._levels = None
+        self._stale = True
+
+        # Culling and transition bounds by id, from the last call to prepare, or None once anything has changed
+        self._culled = None
+        self._was_outside = None
+        self._merged = None
+        self._bounds = None
+
+    @staticmethod
+    def is_available():
+        return numpy is not None
+
+    def _grow(self):
+        capacity = len(self._components)
+        self._current = numpy.concatenate((self._current, numpy.zeros_like(self._current)))
+        self._previous = numpy.concatenate((self._previous, numpy.zeros_like(self._previous)))
+        self._absolute = numpy.concatenate((self._absolute, numpy.zeros_like(self._absolute)))
+        self._parents = numpy.concatenate((self._parents, numpy.full(capacity, -1, dtype=numpy.intp)))
+        self._depths = numpy.concatenate((self._depths, numpy.zeros_like(self._depths)))
+        self._live = numpy.concatenate((self._live, numpy.zeros_like(self._live)))
+        self._components.extend([None] * capacity)
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, component, parent_id=-1):
+        if not self._free:
+            self._grow()
+        id_ = self._free.pop()
+        self._current[id_] = component.x, component.y, component.w, component.h
+        self._previous[id_] = component.old_x, component.old_y, component.old_w, component.old_h
+        self._parents[id_] = parent_id
+        self._depths[id_] = 0 if parent_id < 0 else self._depths[parent_id] + 1
+        self._live[id_] = True
+        self._components[id_] = component
+        self._levels = None
+        self._stale = True
+        self._culled = None
+        return id_
+
+    def remove(self, id_):
+        self._live[id_] = False
+        self._parents[id_] = -1
+        self._components[id_] = None
+        self._free.append(id_)
+        self._levels = None
+        self._stale = True
+        self._culled = None
+
+    def set(self, id_, column, value):
+        self._current[id_, column] = value
+        self._culled = None
+        if column <= GeometryStore.Y:
+            self._stale = True
+
+    def flip(self):
+        self._previous[:] = self._current
+        self._culled = None
+        # Offsets are brought up to date once a frame, rather than on the first read after every move
+        if self._stale:
+            self._update()
+
+    def component(self, id_):
+        return self._components[id_]
+
+    def _update(self):
+        if self._levels is None:
+            live = numpy.flatnonzero(self._live)
+            depths = self._depths[live]
+            self._levels = [live[depths == depth] for depth in range(depths.max() + 1)] if len(live) else []
+        for depth, ids in enumerate(self._levels):
+            self._absolute[ids] = self._current[ids, :2]
+            if depth:
+                self._absolute[ids] += self._absolute[self._parents[ids]]
+        self._stale = False
+
+    def prepare(self):
+        # Computes what the output step asks of every component in one batch, which holds until anything changes
+        if self._stale:
+            self._update()
+        current, previous, parents = self._current, self._previous, self._parents
+        X, Y, W, H = GeometryStore.X, GeometryStore.Y, GeometryStore.W, GeometryStore.H
+
+        # Ids that were outside of their parent, and those that still are
+        was_outside = self._live & (parents >= 0) & _outside(previous, previous[parents])
+        self._was_outside = was_outside.tolist()
+        self._culled = (was_outside & _outside(current, current[parents])).tolist()
+
+        # Bounds of the previous and current rect of each id, where they cover less than the two apart
+        left = numpy.minimum(current[:, X], previous[:, X])
+        top = numpy.minimum(current[:, Y], previous[:, Y])
+        w = numpy.maximum(current[:, X] + current[:, W], previous[:, X] + previous[:, W]) - left
+        h = numpy.maximum(current[:, Y] + current[:, H], previous[:, Y] + previous[:, H]) - top
+        self._merged = (current[:, W] * current[:, H] + previous[:, W] * previous[:, H] > w * h).tolist()
+        self._bounds = numpy.stack((left, top, w, h), axis=1)
+
+    @property
+    def is_prepared(self):
+        return self._culled is not None
+
+    @property
+    def culled(self):
+        # Lists indexed by id, so that components can look them up without a call each
+        return self._culled
+
+    @property
+    def was_outside(self):
+        return self._was_outside
+
+    def transition_bounds(self, id_):
+        # None if the previous and current rect are better redrawn apart
+        if not self._merged[id_]:
+            return None
+        return self._bounds[id_].tolist()
+
+    def abs_pos(self, id_):
+        # None while positions have changed since the last update, when walking the parents is cheaper
+        if self._stale:
+            return None
+        x, y = self._absolute[id_]
+        return int(x), int(y)
+
+    def absolute(self):
+        # Absolute rects of every live id, as (ids, x, y, w, h) arrays
+        if self._stale:
+            self._update()
+        ids = numpy.flatnonzero(self._live)
+        x, y = self._absolute[ids].T
+        return ids, x, y, self._current[ids, GeometryStore.W], self._current[ids, GeometryStore.H]
+
+    def __len__(self):
+        return int(self._live.sum())
+
+    def __str__(self):
+        return '{}({} components)'.format(self.__class__.__name__, len(self))
+
+    __repr__ = __str__
+
+
+def _outside(rects, bounds):
+    x, y, w, h = rects.T
+    return (x >= bounds[:, GeometryStore.W]) | (y >= bounds[:, GeometryStore.H]) | (x + w <= 0) | (y + h <= 0)
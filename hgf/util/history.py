@@ -0,0 +1,168 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+from collections import deque
+
+
+class Edit:
+    __slots__ = ('start', 'removed', 'inserted', 'before', 'after', 'kind')
+
+    def __init__(self, start, removed, inserted, before, after, kind=None):
+        # `text[start:start + len(removed)]` was replaced with `inserted`
+        self.start = start
+        self.removed = removed
+        self.inserted = inserted
+
+        # Caller state (e.g. cursor and highlight) from before and after the edit
+        self.before = before
+        self.after = after
+
+        # Consecutive edits of the same kind may be merged
+        self.kind = kind
+
+    @property
+    def size(self):
+        return len(self.removed) + len(self.inserted)
+
+    def __repr__(self):
+        return 'Edit(start={}, removed={!r}, inserted={!r})'.format(self.start, self.removed, self.inserted)
+
+    __str__ = __repr__
+
+
+class EditHistory:
+    MEMORY_LIMIT = 2**20
+    MERGE_LIMIT = 256
+
+    INSERT = 'insert'
+    BACKSPACE = 'backspace'
+    DELETE = 'delete'
+
+    def __init__(self, limit=None):
+        self._limit = EditHistory.MEMORY_LIMIT if limit is None else limit
+        self._undo = deque()
+        self._redo = []
+        self._merging = False
+
+        # Number of characters stored across all edits
+        self.size = 0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @limit.setter
+    def limit(self, other):
+        self._limit = other
+        self._evict()
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, start, removed, inserted, before, after, kind=None):
+        if not removed and not inserted:
+            return
+        for edit in self._redo:
+            self.size -= edit.size
+        self._redo.clear()
+
+        if not self._merge(start, removed, inserted, after, kind):
+            self._undo.append(Edit(start, removed, inserted, before, after, kind))
+            self.size += len(removed) + len(inserted)
+        self._merging = kind is not None
+        self._evict()
+
+    def _merge(self, start, removed, inserted, after, kind):
+        if not self._merging or not self._undo:
+            return False
+        last = self._undo[-1]
+        if kind is None or kind != last.kind or last.size + len(removed) + len(inserted) > EditHistory.MERGE_LIMIT:
+            return False
+
+        # Typing continues from the end of the last insertion, but a new line starts a new step
+        if kind == EditHistory.INSERT:
+            if removed or start != last.start + len(last.inserted) or '\r' in inserted:
+                return False
+            last.inserted += inserted
+        # Backspacing removes text just before the last removal
+        elif kind == EditHistory.BACKSPACE:
+            if inserted or start + len(removed) != last.start:
+                return False
+            last.start = start
+            last.removed = removed + last.removed
+        # Deleting removes text just after the last removal
+        elif kind == EditHistory.DELETE:
+            if inserted or start != last.start:
+                return False
+            last.removed += removed
+        else:
+            return False
+
+        last.after = after
+        self.size += len(removed) + len(inserted)
+        return True
+
+    def separate(self):
+        # The next edit will start a new step
+        self._merging = False
+
+    def undo(self):
+        # Returns the edit to reverse, or None
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        self._redo.append(edit)
+        self._merging = False
+        return edit
+
+    def redo(self):
+        # Returns the edit to reapply, or None
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        self._undo.append(edit)
+        self._merging = False
+        return edit
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._merging = False
+        self.size = 0
+
+    def _evict(self):
+        # Forget the oldest steps first, then the redo stack
+        while self.size > self._limit and self._undo:
+            self.size -= self._undo.popleft().size
+        while self.size > self._limit and self._redo:
+            self.size -= self._redo.pop(0).size
+
+    def __len__(self):
+        return len(self._undo)
+
+    def __str__(self):
+        return '{}({} undo, {} redo, {}/{})'.format(
+            self.__class__.__name__, len(self._undo), len(self._redo), self.size, self._limit)
+
+    __repr__ = __str__
@@ -0,0 +1,120 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+from .cache import surface_bytes
+
+import pygame
+
+from collections import OrderedDict
+import weakref
+
+
+class SurfacePool:
+    MIN_STEP = 16
+    STEP_BITS = 3
+
+    def __init__(self, budget):
+        # Bytes of idle buffers to keep around
+        self._budget = budget
+        self.weight = 0
+
+        # Idle buffers by (bucket w, bucket h, flags, depth), least recently released first
+        self._free = OrderedDict()
+
+        # Buffer and key behind each view that's been handed out
+        self._leased = weakref.WeakKeyDictionary()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @budget.setter
+    def budget(self, other):
+        self._budget = other
+        self._evict()
+
+    @staticmethod
+    def _bucket(n):
+        # Round up to a step of at least an eighth of the size, so that nearby sizes share buffers
+        step = max(SurfacePool.MIN_STEP, 1 << max(n.bit_length() - SurfacePool.STEP_BITS, 0))
+        return max(-(-n // step) * step, step)
+
+    def acquire(self, size, flags=0, depth=0):
+        # Returns a cleared view of a pooled buffer at least as big as `size`
+        w, h = size
+        key = SurfacePool._bucket(w), SurfacePool._bucket(h), flags, depth
+        buffers = self._free.get(key)
+        if buffers:
+            buffer = buffers.pop()
+            if not buffers:
+                del self._free[key]
+            self.weight -= surface_bytes(buffer)
+            self.hits += 1
+        else:
+            buffer = pygame.Surface(key[:2], flags, depth) if depth else pygame.Surface(key[:2], flags)
+            self.misses += 1
+        view = buffer.subsurface((0, 0, w, h))
+        view.fill((0, 0, 0, 0))
+        self._leased[view] = key, buffer
+        return view
+
+    def release(self, surface):
+        # Surfaces that didn't come from the pool are ignored
+        if surface is None:
+            return
+        try:
+            key, buffer = self._leased.pop(surface)
+        except KeyError:
+            return
+        self._free.setdefault(key, []).append(buffer)
+        self._free.move_to_end(key)
+        self.weight += surface_bytes(buffer)
+        self._evict()
+
+    def clear(self):
+        self._free.clear()
+        self.weight = 0
+
+    def _evict(self):
+        while self.weight > self._budget and self._free:
+            key, buffers = next(iter(self._free.items()))
+            self.weight -= surface_bytes(buffers.pop(0))
+            if not buffers:
+                del self._free[key]
+            self.evictions += 1
+
+    @property
+    def leased(self):
+        return len(self._leased)
+
+    @property
+    def idle(self):
+        return sum(len(buffers) for buffers in self._free.values())
+
+    def __str__(self):
+        return '{}({} leased, {} idle, {}/{}, {} hits, {} misses, {} evictions)'.format(
+            self.__class__.__name__, self.leased, self.idle, self.weight, self._budget,
+            self.hits, self.misses, self.evictions)
+
+    __repr__ = __str__
@@ -0,0 +1,332 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+
+import random
+
+
+class _Node:
+    __slots__ = ('text', 'priority', 'left', 'right', 'size', 'newlines', 'total_newlines')
+
+    def __init__(self, text, newline):
+        self.text = text
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.size = len(text)
+        self.newlines = text.count(newline)
+        self.total_newlines = self.newlines
+
+
+def _size(node):
+    return 0 if node is None else node.size
+
+
+def _newlines(node):
+    return 0 if node is None else node.total_newlines
+
+
+def _update(node):
+    node.size = _size(node.left) + len(node.text) + _size(node.right)
+    node.total_newlines = _newlines(node.left) + node.newlines + _newlines(node.right)
+    return node
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        a.right = _merge(a.right, b)
+        return _update(a)
+    b.left = _merge(a, b.left)
+    return _update(b)
+
+
+class Rope:
+    CHUNK_SIZE = 256
+
+    def __init__(self, text='', newline='\r'):
+        self.newline = newline
+        self._root = None
+        self._text = None
+        self._root = self._build(text)
+
+    def _build(self, text):
+        root = None
+        for i in range(0, len(text), Rope.CHUNK_SIZE):
+            root = _merge(root, _Node(text[i:i + Rope.CHUNK_SIZE], self.newline))
+        return root
+
+    def _split(self, node, index):
+        # Split into the first `index` characters and the rest
+        if node is None:
+            return None, None
+        left_size = _size(node.left)
+        if index <= left_size:
+            left, node.left = self._split(node.left, index)
+            return left, _update(node)
+        index -= left_size
+        if index >= len(node.text):
+            node.right, right = self._split(node.right, index - len(node.text))
+            return _update(node), right
+        left, right = node.left, node.right
+        return (_merge(left, _Node(node.text[:index], self.newline)),
+                _merge(_Node(node.text[index:], self.newline), right))
+
+    def __len__(self):
+        return _size(self._root)
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ''.join(self._chunks(0))
+        return self._text
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return str(self)[key]
+            if self._text is not None:
+                return self._text[start:stop]
+            result = []
+            remaining = stop - start
+            for chunk in self._chunks(start):
+                if remaining <= 0:
+                    break
+                result.append(chunk[:remaining])
+                remaining -= len(chunk)
+            return ''.join(result)
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('Rope index out of range')
+        node = self._root
+        while True:
+            left_size = _size(node.left)
+            if key < left_size:
+                node = node.left
+            elif key < left_size + len(node.text):
+                return node.text[key - left_size]
+            else:
+                key -= left_size + len(node.text)
+                node = node.right
+
+    def _chunks(self, index):
+        # Text from `index` onwards, in chunks
+        stack = []
+        node = self._root
+        while node is not None:
+            left_size = _size(node.left)
+            if index < left_size:
+                stack.append(node)
+                node = node.left
+            elif index < left_size + len(node.text):
+                yield node.text[index - left_size:]
+                node = node.right
+                break
+            else:
+                index -= left_size + len(node.text)
+                node = node.right
+        else:
+            node = None
+        while True:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            yield node.text
+            node = node.right
+
+    def _reversed_chunks(self, index):
+        # Text before `index`, in reversed chunks
+        stack = []
+        node = self._root
+        while node is not None:
+            left_size = _size(node.left)
+            if index <= left_size:
+                node = node.left
+            elif index <= left_size + len(node.text):
+                yield node.text[index - left_size - 1::-1]
+                node = node.left
+                break
+            else:
+                stack.append(node)
+                index -= left_size + len(node.text)
+                node = node.right
+        else:
+            node = None
+        while True:
+            while node is not None:
+                stack.append(node)
+                node = node.right
+            if not stack:
+                return
+            node = stack.pop()
+            yield node.text[::-1]
+            node = node.left
+
+    def find(self, sub, start=0, end=None):
+        # Like str.find, but only joins the chunks that are searched
+        size = len(self)
+        end = size if end is None else min(end, size)
+        if self._text is not None:
+            return self._text.find(sub, start, end)
+        if not sub:
+            return start if start <= end else -1
+        offset = start
+        carry = ''
+        for chunk in self._chunks(start):
+            if offset >= end:
+                break
+            window = carry + chunk[:end - offset]
+            index = window.find(sub)
+            if index != -1:
+                return offset - len(carry) + index
+            offset += len(chunk)
+            carry = window[len(window) - len(sub) + 1:] if len(sub) > 1 else ''
+        return -1
+
+    def chars(self, index=0, reverse=False):
+        chunks = self._reversed_chunks(index) if reverse else self._chunks(index)
+        for chunk in chunks:
+            yield from chunk
+
+    def _path_to(self, index):
+        # Nodes from the root down to the one containing `index`, and the offset within it
+        path = []
+        node = self._root
+        while node is not None:
+            path.append(node)
+            left_size = _size(node.left)
+            if index < left_size or (index == left_size and node.left is not None):
+                node = node.left
+            elif index <= left_size + len(node.text):
+                return path, index - left_size
+            else:
+                index -= left_size + len(node.text)
+                node = node.right
+        return None, None
+
+    def _edit_in_place(self, start, end, text):
+        # Edits contained within a single chunk just rewrite that chunk and fix up the sizes above it
+        path, offset = self._path_to(start)
+        if path is None:
+            return False
+        node = path[-1]
+        removed = end - start
+        if offset + removed > len(node.text) or len(node.text) - removed + len(text) > 2 * Rope.CHUNK_SIZE:
+            return False
+        if removed == len(node.text) and not text:
+            return False
+        old_newlines = node.newlines
+        node.text = node.text[:offset] + text + node.text[offset + removed:]
+        node.newlines = node.text.count(self.newline)
+        size_change = len(text) - removed
+        newline_change = node.newlines - old_newlines
+        for ancestor in path:
+            ancestor.size += size_change
+            ancestor.total_newlines += newline_change
+        return True
+
+    def insert(self, index, text):
+        if not text:
+            return
+        self._text = None
+        if self._edit_in_place(index, index, text):
+            return
+        left, right = self._split(self._root, index)
+
+        # Absorb a short run of preceding text so that typing doesn't leave a chunk per keystroke
+        absorb = min(index, max(Rope.CHUNK_SIZE - len(text), 0))
+        left, before = self._split(left, index - absorb)
+        text = ''.join(self._subtree_chunks(before)) + text
+        self._root = _merge(_merge(left, self._build(text)), right)
+
+    def delete(self, start, end):
+        if start >= end:
+            return
+        self._text = None
+        if self._edit_in_place(start, end, ''):
+            return
+        left, right = self._split(self._root, start)
+        _, right = self._split(right, end - start)
+        self._root = _merge(left, right)
+
+    def replace(self, start, end, text):
+        self.delete(start, end)
+        self.insert(start, text)
+
+    @staticmethod
+    def _subtree_chunks(node):
+        stack = []
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.text
+            node = node.right
+
+    def line_of(self, index):
+        # Number of newlines before `index`
+        result = 0
+        node = self._root
+        while node is not None:
+            left_size = _size(node.left)
+            if index <= left_size:
+                node = node.left
+            elif index <= left_size + len(node.text):
+                return result + _newlines(node.left) + node.text.count(self.newline, 0, index - left_size)
+            else:
+                result += _newlines(node.left) + node.newlines
+                index -= left_size + len(node.text)
+                node = node.right
+        return result
+
+    def line_start(self, line):
+        # Index just after the `line`th newline
+        if line <= 0:
+            return 0
+        offset = 0
+        node = self._root
+        while node is not None:
+            left_newlines = _newlines(node.left)
+            if line <= left_newlines:
+                node = node.left
+            elif line <= left_newlines + node.newlines:
+                line -= left_newlines
+                index = -1
+                for _ in range(line):
+                    index = node.text.index(self.newline, index + 1)
+                return offset + _size(node.left) + index + 1
+            else:
+                line -= left_newlines + node.newlines
+                offset += _size(node.left) + len(node.text)
+                node = node.right
+        raise IndexError('Rope line out of range')
+
+    def __repr__(self):
+        return 'Rope({!r})'.format(str(self))
@@ -56,5 +56,9 @@ setup(
             'pygame (>=1.9.1)',
             'pyperclip (>=1.6.0)',
         ],
+        extras_require={
+            # For the geometry-store option
+            'numpy': ['numpy (>=1.10.0)'],
+        },
         provides=['hgf']
 )
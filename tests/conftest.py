@@ -0,0 +1,58 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import json
+import os
+
+# Surfaces are drawn and compared headlessly
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import pytest
+
+from hgf import AppManager
+
+
+@pytest.fixture(autouse=True)
+def pygame_init():
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    # Writes an app directory with the given options, and spawns the app from it
+    def make_app(**options):
+        monkeypatch.chdir(tmp_path)
+        files = {
+            'test': {'info': 'info', 'config': 'config'},
+            'info/fonts': {}, 'info/images': {}, 'info/sounds': {}, 'info/music': {},
+            'config/resources': {},
+            'config/controls': {},
+            'config/options': {'global': {'window': dict({'size': [200, 200], 'title': 'test'}, **options)}},
+            'config/style': {'global': {'window': {'bg-color': [0, 0, 0]}}},
+        }
+        for name, info in files.items():
+            path = tmp_path / 'appdata' / (name + '.json')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(info))
+        manager = AppManager('test')
+        manager.load()
+        return manager.spawn_app()
+    return make_app
@@ -0,0 +1,51 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pygame
+import pytest
+
+from hgf.gui import FlatComponent
+from hgf.util.alpha import BLEND_PREMULTIPLIED
+
+
+pytestmark = pytest.mark.skipif(BLEND_PREMULTIPLIED is None, reason='requires BLEND_PREMULTIPLIED')
+
+
+def test_mode_is_set_before_the_first_step(make_app):
+    app = make_app(**{'premultiplied-alpha': True})
+    assert app._premultiplied
+
+
+class Badge(FlatComponent):
+    def __init__(self):
+        super().__init__(opacity=1)
+
+    def on_load(self):
+        super().on_load()
+        surface = pygame.Surface((10, 10), pygame.SRCALPHA)
+        surface.fill((255, 0, 0, 128))
+        self.background = surface
+
+
+def test_backgrounds_set_before_the_first_step_are_premultiplied(make_app):
+    app = make_app(**{'premultiplied-alpha': True})
+    badge = Badge()
+    app.register_load(badge)
+    assert badge.background.get_at((0, 0)) == (128, 0, 0, 128)
+    app._recursive_step(0)
+    assert app._display.get_at((5, 5))[:3] == (128, 0, 0)
@@ -0,0 +1,73 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pygame
+
+from hgf.app import AppResources
+from hgf.gui import LayeredComponent
+
+
+def load_atlas(images):
+    resources = AppResources(directory=None)
+    resources.images.update(images)
+    resources.load_atlases({'all': {'size': (64, 64)}})
+    return resources
+
+
+def solid(color, flags=0, colorkey=None):
+    surface = pygame.Surface((8, 8), flags)
+    surface.fill(color)
+    surface.set_colorkey(colorkey)
+    return surface
+
+
+def test_images_keep_their_kind_of_alpha():
+    resources = load_atlas({
+        'translucent': solid((200, 100, 50, 128), pygame.SRCALPHA),
+        'opaque': solid((10, 20, 30)),
+        'keyed': solid((10, 20, 30), colorkey=(0, 0, 0)),
+    })
+    translucent, opaque, keyed = (resources.images[name] for name in ('translucent', 'opaque', 'keyed'))
+    assert len(resources.atlases['all'].pages) == 3
+
+    assert translucent.get_flags() & pygame.SRCALPHA
+    assert translucent.get_at((0, 0)) == (200, 100, 50, 128)
+
+    assert not opaque.get_flags() & pygame.SRCALPHA
+    assert opaque.get_alpha() is None and opaque.get_colorkey() is None
+    assert opaque.get_at((0, 0)) == (10, 20, 30, 255)
+
+    assert not keyed.get_flags() & pygame.SRCALPHA
+    assert keyed.get_colorkey() == (0, 0, 0, 255)
+
+
+def test_images_of_the_same_kind_share_a_page():
+    resources = load_atlas({'a': solid((10, 20, 30)), 'b': solid((40, 50, 60))})
+    assert len(resources.atlases['all'].pages) == 1
+    assert resources.images['a'].get_parent() is resources.images['b'].get_parent()
+
+
+def test_packed_opaque_image_is_an_opaque_background():
+    resources = load_atlas({'tile': solid((10, 20, 30))})
+    panel = LayeredComponent(w=8, h=8)
+    panel.load()
+    panel._recursive_step(0)
+    panel.background = resources.images['tile']
+    panel._recursive_step(0)
+    assert panel._is_cover()
+    assert panel._display.get_at((4, 4)) == (10, 20, 30, 255)
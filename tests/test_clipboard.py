@@ -0,0 +1,50 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import time
+
+import pyperclip
+
+from hgf.util import Clipboard
+
+
+def wait_for(clipboard, pasted, count):
+    deadline = time.monotonic() + 5
+    while len(pasted) < count and time.monotonic() < deadline:
+        clipboard.poll()
+        time.sleep(0.01)
+
+
+def test_worker_survives_failures(monkeypatch):
+    def fail(*args):
+        raise OSError('xclip could not be spawned')
+    monkeypatch.setattr(pyperclip, 'copy', fail)
+    monkeypatch.setattr(pyperclip, 'paste', fail)
+
+    clipboard = Clipboard()
+    clipboard._has_scrap = False
+    pasted = []
+    clipboard.copy('copied')
+    clipboard.paste(pasted.append)
+    wait_for(clipboard, pasted, 1)
+    assert pasted == ['copied']
+
+    monkeypatch.setattr(pyperclip, 'paste', lambda: 'system')
+    clipboard.paste(pasted.append)
+    wait_for(clipboard, pasted, 2)
+    assert pasted == ['copied', 'system']
@@ -0,0 +1,173 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pygame
+
+from hgf.gui import FlatComponent, LayeredComponent
+
+
+RED = (255, 0, 0, 255)
+GREEN = (0, 255, 0, 255)
+BLUE = (0, 0, 255, 255)
+
+
+class Panel(LayeredComponent):
+    def __init__(self, bgcolor, **kwargs):
+        super().__init__(bgcolor=bgcolor, **kwargs)
+
+
+def step(root):
+    root._recursive_step(0)
+
+
+def make_tree(*, flatten):
+    root = Panel(BLUE, w=200, h=200)
+    root.load()
+    panel = Panel(GREEN, w=50, h=50, flatten=flatten)
+    child = Panel(RED, x=30, y=30, w=60, h=60)
+    root.register_load(panel)
+    panel.register_load(child)
+    step(root)
+    return root, panel, child
+
+
+def test_flattened_children_are_clipped():
+    root, panel, child = make_tree(flatten=True)
+    assert root._display.get_at((45, 45)) == RED
+    assert root._display.get_at((75, 75)) == BLUE
+
+
+def test_growing_flattened_component_unclips_children():
+    for flatten in (False, True):
+        root, panel, child = make_tree(flatten=flatten)
+        panel.size = (100, 100)
+        root._repaint()
+        step(root)
+        assert root._display.get_at((75, 75)) == RED
+
+
+def test_shrinking_flattened_component_clips_children():
+    root, panel, child = make_tree(flatten=True)
+    panel.size = (40, 40)
+    root._repaint()
+    step(root)
+    assert root._display.get_at((45, 45)) == BLUE
+    assert root._display.get_at((35, 35)) == RED
+
+
+def test_resizing_inside_transparent_component_rebuilds_draw_list():
+    root = Panel(BLUE, w=200, h=200)
+    root.load()
+    group = Panel(None, x=10, y=10, w=150, h=150, opacity=0)
+    panel = Panel(GREEN, w=50, h=50, flatten=True)
+    child = Panel(RED, x=30, y=30, w=60, h=60)
+    root.register_load(group)
+    group.register_load(panel)
+    panel.register_load(child)
+    step(root)
+    assert root._display.get_at((85, 85)) == BLUE
+
+    # The flattened panel is drawn by the root, through its transparent parent
+    panel.size = (100, 100)
+    root._repaint()
+    step(root)
+    assert root._display.get_at((85, 85)) == RED
+
+    group.size = (40, 40)
+    root._repaint()
+    step(root)
+    assert root._display.get_at((85, 85)) == RED
+
+
+def make_occluded_tree():
+    root = Panel(BLUE, w=200, h=200)
+    root.load()
+    behind = Panel(RED, w=100, h=100)
+    front = Panel(GREEN, w=100, h=100)
+    root.register_load(behind, front)
+    step(root)
+    return root, behind, front
+
+
+def test_redraws_dont_scan_covering_displays(monkeypatch):
+    import pygame.mask
+    root, behind, front = make_occluded_tree()
+    scans = []
+    from_surface = pygame.mask.from_surface
+    monkeypatch.setattr(pygame.mask, 'from_surface', lambda surface: scans.append(surface) or from_surface(surface))
+    for i in range(3):
+        front._set_dirty(True)
+        step(root)
+    assert len(scans) <= 1
+    assert root._display.get_at((50, 50)) == GREEN
+
+
+def test_key_colour_drawn_by_descendant_shows_through():
+    root, behind, front = make_occluded_tree()
+    hole = Panel((0, 0, 0), x=40, y=40, w=20, h=20)
+    front.register_load(hole)
+    step(root)
+    hole.colorkey = None
+    root._repaint()
+    step(root)
+    assert root._display.get_at((50, 50)) == RED
+    assert root._display.get_at((10, 10)) == GREEN
+
+
+def swatch(size):
+    surface = pygame.Surface(size)
+    surface.fill(GREEN)
+    return surface
+
+
+class Swatch(FlatComponent):
+    def __init__(self, **kwargs):
+        super().__init__(opacity=2, w=20, h=20, **kwargs)
+
+    def refresh_background(self):
+        self.background = self._make_background(swatch, self.size)
+
+
+def test_colorkey_doesnt_change_shared_backgrounds(make_app):
+    app = make_app()
+    keyed, other = Swatch(), Swatch(x=30)
+    app.register_load(keyed, other)
+    app._recursive_step(0)
+    assert keyed.background is other.background
+
+    keyed.colorkey = GREEN
+    app._recursive_step(0)
+    assert keyed.background is not other.background
+    assert keyed.background.get_colorkey() == GREEN
+    assert other.background.get_colorkey() == (0, 0, 0, 255)
+
+
+def test_shared_backgrounds_are_scanned_once(make_app, monkeypatch):
+    import pygame.mask
+    app = make_app()
+    swatches = [Swatch(x=30 * i) for i in range(3)]
+    app.register_load(*swatches)
+    app._recursive_step(0)
+    scans = []
+    from_surface = pygame.mask.from_surface
+    monkeypatch.setattr(pygame.mask, 'from_surface', lambda surface: scans.append(surface) or from_surface(surface))
+    for i in range(3):
+        for swatch in swatches:
+            swatch.background = swatch.background
+            assert swatch._is_cover()
+    assert len(scans) <= 1
@@ -0,0 +1,127 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pytest
+
+from hgf import Component, double_buffer
+from hgf.double_buffer import _HookHandler
+
+
+class Node(metaclass=_HookHandler):
+    # Steps the hooks of its double buffers the way a Component does, but through the descriptors
+    def __init__(self):
+        self.is_loaded = False
+        self._children = []
+
+    def load(self):
+        self.is_loaded = True
+
+    def _on_transition_queued(self):
+        pass
+
+    def _recursive_step(self, elapsed):
+        self._recursive_call_transition_hooks()
+        self._recursive_refresh_responsive_attrs()
+        self._flip_transition_hooks()
+
+
+def recorder_class(base):
+    class Recorder(base):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.log = []
+            self.a = 0
+            self.b = 0
+            self.c = 0
+
+        @double_buffer
+        class a:
+            def on_transition(self):
+                self.log.append('a')
+
+            def on_change(self, before, after):
+                self.log.append(('a', before, after))
+
+        @double_buffer
+        class b:
+            def on_transition(self):
+                self.log.append('b')
+                self.c += 1
+
+        @double_buffer
+        class c:
+            def on_transition(self):
+                self.log.append('c')
+
+    return Recorder
+
+
+Recorder = recorder_class(Node)
+CompiledRecorder = recorder_class(Component)
+
+
+@pytest.fixture(params=[Recorder, CompiledRecorder])
+def recorder(request):
+    recorder = request.param()
+    recorder.load()
+    recorder._recursive_step(0)
+    recorder.log.clear()
+    return recorder
+
+
+def transitions(recorder):
+    recorder.log.clear()
+    recorder._recursive_step(0)
+    return [entry for entry in recorder.log if isinstance(entry, str)]
+
+
+def test_components_use_generated_accessors():
+    assert isinstance(vars(Component)['is_visible'], property)
+    assert isinstance(vars(CompiledRecorder)['a'], property)
+    assert not isinstance(vars(Recorder)['a'], property)
+
+
+def test_change_hooks_run_immediately(recorder):
+    recorder.a = 1
+    recorder.a = 1
+    recorder.a = 2
+    assert recorder.log == [('a', 0, 1), ('a', 1, 2)]
+
+
+def test_transition_hooks_run_in_the_order_values_were_last_set(recorder):
+    recorder.a = 1
+    recorder.c = 1
+    recorder.a = 2
+    assert transitions(recorder) == ['c', 'a']
+    assert recorder.old_a == 2 and recorder.old_c == 1
+
+
+def test_reverted_values_have_no_transition(recorder):
+    recorder.a = 1
+    recorder.c = 1
+    recorder.a = 0
+    assert transitions(recorder) == ['c']
+    assert transitions(recorder) == []
+
+
+def test_values_set_by_transition_hooks_transition_too(recorder):
+    recorder.b = 1
+    recorder.a = 1
+    assert transitions(recorder) == ['b', 'a', 'c']
+    assert recorder.old_c == 1
+
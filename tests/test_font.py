@@ -0,0 +1,42 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pygame
+import pygame.freetype
+import pytest
+
+from hgf.util import FontManager, GlyphAtlas
+
+
+@pytest.fixture(params=[False, True], ids=['no kerning', 'kerning'])
+def font(request):
+    pygame.freetype.init()
+    face = pygame.freetype.Font(None)
+    face.pad = True
+    face.kerning = request.param
+    return FontManager(8).get(face, 14)
+
+
+@pytest.mark.parametrize('text', ['12:34:56', 'FPS: 60', 'AVAWAy Tj', 'x'])
+def test_glyph_atlas_renders_like_font(font, text):
+    expected = font.render(text, (20, 200, 90))[0]
+    atlas = GlyphAtlas(font, (20, 200, 90))
+    for i in range(2):
+        rendered = atlas.render(text)
+        assert rendered.get_size() == expected.get_size()
+        assert pygame.image.tostring(rendered, 'RGBA') == pygame.image.tostring(expected, 'RGBA')
@@ -0,0 +1,117 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pygame
+import pytest
+
+from hgf import LayeredComponent
+from hgf.util import GeometryStore
+from hgf.gui.component import _outside
+
+
+pytestmark = pytest.mark.skipif(not GeometryStore.is_available(), reason='requires numpy')
+
+
+class Panel(LayeredComponent):
+    def __init__(self, bgcolor, **kwargs):
+        super().__init__(bgcolor=bgcolor, **kwargs)
+
+
+def make_scene(app):
+    panels = [Panel((255, 0, 0), x=-120, y=10, w=50, h=50),
+              Panel((0, 255, 0), x=150, y=150, w=40, h=40),
+              Panel((255, 255, 0), x=20, y=20, w=30, h=30)]
+    app.register_load(*panels)
+    inner = Panel((0, 255, 255), x=5, y=5, w=10, h=10)
+    panels[1].register_load(inner)
+    app._recursive_step(0)
+    return panels + [inner]
+
+
+def animate(panels, frame):
+    panels[0].x += 20
+    panels[1].y -= 30
+    panels[2].pos = (20 + 5 * frame, 20)
+    panels[3].w += 3
+
+
+def test_batch_queries_match_components(make_app):
+    app = make_app(**{'geometry-store': True})
+    store = app._geometry
+    panels = make_scene(app)
+    culled = []
+    for frame in range(4):
+        animate(panels, frame)
+        store.prepare()
+        for panel in panels:
+            parent = panel.parent
+            if store.culled[panel._geometry_id]:
+                culled.append(panel)
+            assert store.culled[panel._geometry_id] == (
+                _outside(panel.x, panel.y, panel.w, panel.h, parent.w, parent.h)
+                and _outside(panel.old_x, panel.old_y, panel.old_w, panel.old_h, parent.old_w, parent.old_h))
+
+            new, old = (panel.x, panel.y, panel.w, panel.h), (panel.old_x, panel.old_y, panel.old_w, panel.old_h)
+            union = _union(new, old)
+            bounds = store.transition_bounds(panel._geometry_id)
+            if bounds is None:
+                assert new[2] * new[3] + old[2] * old[3] <= union[2] * union[3]
+            else:
+                assert tuple(bounds) == union
+        app._recursive_step(0)
+    assert culled
+
+
+def test_changes_fall_back_to_components(make_app):
+    app = make_app(**{'geometry-store': True})
+    panels = make_scene(app)
+    app._geometry.prepare()
+    assert app._geometry.is_prepared
+    panels[0].x += 1
+    assert not app._geometry.is_prepared
+
+
+def test_store_draws_the_same(make_app, monkeypatch):
+    lookups = []
+    transition_bounds = GeometryStore.transition_bounds
+    monkeypatch.setattr(GeometryStore, 'transition_bounds',
+                        lambda self, id_: lookups.append(id_) or transition_bounds(self, id_))
+    frames = {}
+    for enabled in (False, True):
+        app = make_app(**{'geometry-store': enabled})
+        assert (app._geometry is not None) == enabled
+        panels = make_scene(app)
+        frames[enabled] = []
+        for frame in range(6):
+            animate(panels, frame)
+            app._recursive_step(0)
+            frames[enabled].append(pygame.image.tostring(app._display, 'RGB'))
+    assert frames[True] == frames[False]
+    assert lookups
+
+
+def _union(rect, other):
+    x, y = min(rect[0], other[0]), min(rect[1], other[1])
+    return x, y, max(rect[0] + rect[2], other[0] + other[2]) - x, max(rect[1] + rect[3], other[1] + other[3]) - y
+
+
+def test_store_without_numpy_is_ignored_with_a_warning(make_app, monkeypatch, caplog):
+    monkeypatch.setattr(GeometryStore, 'is_available', staticmethod(lambda: False))
+    app = make_app(**{'geometry-store': True})
+    assert app._geometry is None
+    assert 'numpy' in caplog.text
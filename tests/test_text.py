@@ -0,0 +1,93 @@
+###############################################################################
+#                                                                             #
+#   Copyright 2017 - Ben Frankel                                              #
+#                                                                             #
+#   Licensed under the Apache License, Version 2.0 (the "License");           #
+#   you may not use this file except in compliance with the License.          #
+#   You may obtain a copy of the License at                                   #
+#                                                                             #
+#       http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                             #
+#   Unless required by applicable law or agreed to in writing, software       #
+#   distributed under the License is distributed on an "AS IS" BASIS,         #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  #
+#   See the License for the specific language governing permissions and       #
+#   limitations under the License.                                            #
+#                                                                             #
+###############################################################################
+
+import pygame
+import pygame.freetype
+import pytest
+
+from hgf.gui import TextBox, TextEntryBox
+
+
+def background(size, *args):
+    surface = pygame.Surface(size)
+    surface.fill((255, 255, 255))
+    return surface
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    pygame.freetype.init()
+    face = pygame.freetype.Font(None)
+    face.pad = True
+    app._config.style['global'] = {'global': {
+        'font': face, 'fg-color': (0, 0, 0), 'background': background,
+        'cursor-bg': background, 'highlight-bg-color': (0, 0, 255, 128),
+    }}
+    app._config.options['global'] = {'global': {'font-size': 14}}
+    return app
+
+
+def test_assigned_text_is_wrapped_on_refresh(app):
+    box = TextBox('one', w=150, h=60)
+    app.register_load(box)
+    app._recursive_step(0)
+    assert box.lines[0].text == 'one'
+
+    box.text = 'two'
+    box.refresh_layout_flag = True
+    app._recursive_step(0)
+    assert box.lines[0].text == 'two'
+    assert box.text == 'two'
+
+
+def type_text(box, text):
+    for char in text:
+        box._handle_key(char, ord(char), 0)
+
+
+def test_assigned_text_can_be_edited(app):
+    box = TextEntryBox(w=150, h=60)
+    app.register_load(box)
+    app._recursive_step(0)
+    type_text(box, 'hello world')
+    assert box.text == 'hello world'
+
+    box.text = 'hi'
+    assert box.lines[0].text == 'hi'
+    assert box._cursor_place.index == 2
+
+    box._handle_key('', pygame.K_LEFT, 0)
+    box._handle_key('', pygame.K_BACKSPACE, 0)
+    type_text(box, 'y')
+    assert box.text == 'yi'
+    app._recursive_step(0)
+    assert box.lines[0].text == 'yi'
+
+
+def test_assigned_text_clamps_the_highlight(app):
+    box = TextEntryBox(w=150, h=60)
+    app.register_load(box)
+    app._recursive_step(0)
+    type_text(box, 'hello world')
+    box.handle_message(box, TextEntryBox.MSG_HIGHLIGHT_ALL)
+
+    box.text = 'hi'
+    assert (box._hl_cursor_place.index, box._cursor_place.index) == (0, 2)
+    box._handle_key('', pygame.K_BACKSPACE, 0)
+    assert box.text == ''